@@ -1,7 +1,9 @@
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
+import numpy as np
 import colorsys as cs
 
+# Above this number of jobs only one job label out of n is drawn
+MAX_LABELS = 200
+
 
 def get_new_color(feed=None):
     color = "#"
@@ -20,27 +22,44 @@ def get_new_color(feed=None):
     return color
 
 
-def plot(input_data, label):
+def get_colors(job_ids, lightness=0.7, saturation=0.4):
+    """
+    # Vectorized version of get_new_color: hls_to_rgb of the hue computed from every job id at once
+    :return: (n, 3) array of rgb values
+    """
+    hue = ((np.asarray(job_ids, dtype=float) * 3.34876) % 16) / 16
+    m2 = lightness + saturation - lightness * saturation if lightness > 0.5 else lightness * (1 + saturation)
+    m1 = 2 * lightness - m2
+    rgb = []
+    for shift in (1 / 3, 0, -1 / 3):
+        h = (hue + shift) % 1
+        value = np.where(h < 1 / 6, m1 + (m2 - m1) * h * 6, m1)
+        value = np.where((h >= 1 / 6) & (h < 0.5), m2, value)
+        value = np.where((h >= 0.5) & (h < 2 / 3), m1 + (m2 - m1) * (2 / 3 - h) * 6, value)
+        rgb.append(value)
+    return np.stack(rgb, axis=1)
+
+
+def plot(input_data, label, output_file=None, max_labels=MAX_LABELS):
+    """
+    # Gantt chart of a schedule, one bar collection per server
+    :argument input_data -> rows of (job id, server id, start, end)
+              output_file -> write the figure to this file (png, svg, ...) instead of opening a window
+              max_labels -> above this number of jobs the job labels are downsampled
+    """
+    jobs = np.asarray(input_data, dtype=float).reshape(-1, 4)
+    job_ids = jobs[:, 0].astype(int)
+    server_ids = jobs[:, 1].astype(int)
     # Keep track of the server count
-    server_count = -1
-    # Keep track of the simulation time
-    simulation_time = -1
-    # Create the Job list
-    jobs = []
-    # Open the file
-    # For each line
-    for values in input_data:
-        # Convert the words to integers
-        job = [int(v) for v in values]
-        # Keep track of the server count
-        server_count = max(server_count, job[1])
-        # Keep track of the simulation time
-        simulation_time = max(simulation_time, job[3])
-        # Add the parsed job to the job list
-        jobs.append(job)
-
-    # Create Mat_plot_lib figure
-    fig1 = plt.figure()
+    server_count = server_ids.max(initial=-1)
+
+    # Create Mat_plot_lib figure, matplotlib is only imported once a plot is drawn and pyplot only to open a window
+    if output_file is None:
+        import matplotlib.pyplot as plt
+        fig1 = plt.figure()
+    else:
+        from matplotlib.figure import Figure
+        fig1 = Figure()
 
     print("Creating plots...")
 
@@ -53,26 +72,23 @@ def plot(input_data, label):
     # Set labels
     ax1.set_ylabel("Server ID")
     ax1.set_xlabel("Time step")
-    plt.suptitle(label, fontsize=13)
-
-    # For all jobs
-    for j in jobs:
-        # Add a mat_plot_lib patch
-        ax1.add_patch(
-            # As a rectangle
-            patches.Rectangle(
-                # X is the start time, Y is the Server ID
-                (j[2], j[1] - 0.5),  # (x,y)
-                # Width is the difference between end time and start time
-                abs(j[3] - j[2]),  # width
-                # Height is always 1
-                1,  # height
-                # We assign it a random color
-                facecolor=get_new_color(j[0])
-            )
-        )
-        # Add text for the ID of the job at (almost) the same position
-        ax1.text(j[2] + 0.1, j[1] - 0.06, str(j[0]))
+    fig1.suptitle(label, fontsize=13)
+
+    colors = get_colors(job_ids)
+    widths = np.abs(jobs[:, 3] - jobs[:, 2])
+    # One collection of rectangles per server, X is the start time and the height is always 1
+    for server_id in np.unique(server_ids):
+        on_server = server_ids == server_id
+        ax1.broken_barh(np.column_stack((jobs[on_server, 2], widths[on_server])), (server_id - 0.5, 1),
+                        facecolors=colors[on_server])
+    ax1.autoscale_view()
+
+    # Add text for the ID of the job at (almost) the same position, one label out of step on large schedules
+    step = -(-len(jobs) // max_labels) if max_labels > 0 else len(jobs) + 1
+    for job_id, server_id, start in zip(job_ids[::step], server_ids[::step], jobs[::step, 2]):
+        ax1.text(start + 0.1, server_id - 0.06, str(job_id))
     print("Done...")
-    plt.plot()
-    plt.show()
+    if output_file is None:
+        plt.show()
+    else:
+        fig1.savefig(output_file)
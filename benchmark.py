@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from generator import write_instance
+from scheduler import *
+from sweep import ALGORITHMS
+
+SIZES = (10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6)
+MAX_TIME = 10 ** 12  # WaveFront stops by itself once no event is left
+
+
+def run_algorithm(algorithm, params, power_cap, frequency):
+    """
+    # Parse the instance and run one algorithm, called in a fresh worker process so the peak memory is its own
+    :return: Dictionary of the measures
+    """
+    start = time.perf_counter()
+    data = Parser(params)
+    tasks, servers = data.copy()
+    parse_time = time.perf_counter() - start
+    scheduler = ALGORITHMS[algorithm](tasks=tasks, servers=servers, power_cap=power_cap,
+                                      frequency=frequency, log=EventLog(level=OFF))
+    start = time.perf_counter()
+    if algorithm == 'WaveFront':
+        scheduler.schedule(MAX_TIME)
+    else:
+        scheduler.schedule()
+    wall_time = time.perf_counter() - start
+    return {'parse_time': parse_time,
+            'wall_time': wall_time,
+            'peak_memory_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            'decisions_per_second': len(scheduler.output) / wall_time if wall_time else 0,
+            'decisions': len(scheduler.output),
+            'energy': scheduler.energy,
+            'makespan': scheduler.makespan(),
+            'missed_deadlines': scheduler.missed_deadlines}
+
+
+def run_benchmark(sizes=SIZES, algorithms=tuple(ALGORITHMS), seed=0, tasks_per_server=50, repeat=2,
+                  power_cap=10 ** 9, frequency=1):
+    """
+    # Run every algorithm on a generated instance of every size
+    :return: List of records, one per (algorithm, size)
+    """
+    records = []
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            n_servers = max(4, size // tasks_per_server)
+            params = write_instance(os.path.join(directory, str(size)), size, n_servers, seed)
+            params['repeat'] = str(repeat)
+            params['cache_dir'] = os.path.join(directory, 'cache')
+            for algorithm in algorithms:
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    record = pool.submit(run_algorithm, algorithm, params, power_cap, frequency).result()
+                record.update(algorithm=algorithm, tasks=size, servers=n_servers, seed=seed)
+                records.append(record)
+                print("%-9s %8d tasks %8.3f s %10.0f decisions/s %8.1f MB energy %s" % (
+                    algorithm, size, record['wall_time'], record['decisions_per_second'],
+                    record['peak_memory_mb'], record['energy']))
+    return records
+
+
+def compare(records, baseline, tolerance=0.2):
+    """
+    # Regressions against a baseline: slower scheduling beyond the tolerance, or a different energy,
+    the schedules being deterministic for a given seed
+    :return: List of messages
+    """
+    reference = {(r['algorithm'], r['tasks'], r['seed']): r for r in baseline}
+    regressions = []
+    for record in records:
+        base = reference.get((record['algorithm'], record['tasks'], record['seed']))
+        if base is None:
+            continue
+        if record['wall_time'] > base['wall_time'] * (1 + tolerance):
+            regressions.append("%s %d tasks: wall time %.3f s, baseline %.3f s" % (
+                record['algorithm'], record['tasks'], record['wall_time'], base['wall_time']))
+        if abs(record['energy'] - base['energy']) > 1e-6 * max(1, abs(base['energy'])):
+            regressions.append("%s %d tasks: energy %s, baseline %s" % (
+                record['algorithm'], record['tasks'], record['energy'], base['energy']))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the scheduling algorithms on generated instances")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--algorithms', nargs='+', default=list(ALGORITHMS), choices=list(ALGORITHMS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json', help="file of the measured records")
+    parser.add_argument('--baseline', help="baseline records to detect regressions")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed wall time increase")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.sizes, args.algorithms, args.seed)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(results, json.load(f), args.tolerance)
+        for problem in problems:
+            print("REGRESSION", problem)
+        exit(1 if problems else 0)
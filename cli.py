@@ -0,0 +1,143 @@
+import argparse
+import configparser
+import os
+import sys
+from scheduler import *
+from sweep import ALGORITHMS, COLUMNS, load_sweep, sweep_config, write_table
+from validator import read_results, validate_files
+
+# Options of the INPUT_FILES section of input.ini that can be overridden by a flag of the same name
+OVERRIDES = (('job_file', str), ('server_file', str), ('dependency_file', str), ('power_cap', int),
+             ('energy_cap', float), ('repeat', int), ('frequency', int), ('max_timesteps', int), ('cache_dir', str),
+             ('energy_aware', str), ('enforce_power_cap', str))
+LOG_LEVELS = {'off': OFF, 'warnings': WARNINGS, 'decisions': DECISIONS, 'debug': DEBUG}
+
+
+def load_parameters(args):
+    """
+    # Parameters of the input file, overridden by the flags given on the command line
+    :rtype: Dictionary
+    """
+    parameters = load_params(args.input)
+    for option in dict(OVERRIDES):
+        value = getattr(args, option)
+        if value is not None:
+            parameters[option] = str(value)
+    return parameters
+
+
+def run_algorithm(algorithm, data, parameters, log=None, stats=None):
+    """
+    # Schedule the instance with one algorithm, without printing a summary, writing or plotting
+    # The instance is parsed once by the caller, so a script can make many runs on it
+    :argument data -> Parser of the instance
+    :return: The scheduler, holding the output, energy, missed deadlines and rejected tasks
+    """
+    tasks, servers = data.copy()
+    options = dict(tasks=tasks, servers=servers, power_cap=int(parameters['power_cap']),
+                   frequency=int(parameters['frequency']), log=log, stats=stats,
+                   energy_cap=float(parameters['energy_cap']) if 'energy_cap' in parameters else None,
+                   enforce_power_cap=configparser.ConfigParser.BOOLEAN_STATES[
+                       parameters.get('enforce_power_cap', 'no').lower()])
+    if algorithm == 'HEFT':
+        options['energy_aware'] = configparser.ConfigParser.BOOLEAN_STATES[
+            parameters.get('energy_aware', 'no').lower()]
+    scheduler = ALGORITHMS[algorithm](**options)
+    if algorithm == 'WaveFront':
+        scheduler.stats.call(scheduler.schedule, int(parameters['max_timesteps']))
+    else:
+        scheduler.stats.call(scheduler.schedule)
+    return scheduler
+
+
+def run(args):
+    parameters = load_parameters(args)
+    data = Parser(parameters)
+    for algorithm in args.algorithms:
+        scheduler = run_algorithm(algorithm, data, parameters, log=EventLog(level=LOG_LEVELS[args.log_level]),
+                                  stats=Instrumentation(enabled=args.stats))
+        print(algorithm, "total energy:", scheduler.energy, "Watt, makespan:", scheduler.makespan(),
+              "missed deadlines:", scheduler.missed_deadlines, "rejected tasks:", len(scheduler.rejected))
+        if args.stats:
+            print(scheduler.stats.to_json())
+        if args.write:
+            scheduler.write_results()
+        if args.plot_dir:
+            os.makedirs(args.plot_dir, exist_ok=True)
+            scheduler.render(os.path.join(args.plot_dir, "results_" + algorithm + ".png"))
+        elif args.show:
+            scheduler.render()
+    return 0
+
+
+def run_sweep(args):
+    grid = load_sweep(args.input)
+    if args.algorithms:
+        grid['algorithms'] = args.algorithms
+    results = sweep_config(load_parameters(args), grid, args.workers)
+    print(" ".join(COLUMNS))
+    for row in results:
+        print(" ".join(str(e) for e in row))
+    write_table(results, args.output)
+    return 0
+
+
+def run_plot(args):
+    for file_name in args.files:
+        output_file = None
+        if args.plot_dir:
+            os.makedirs(args.plot_dir, exist_ok=True)
+            output_file = os.path.join(args.plot_dir, os.path.splitext(os.path.basename(file_name))[0] + ".png")
+        plot(input_data=read_results(file_name), label=file_name, output_file=output_file)
+    return 0
+
+
+def run_validate(args):
+    return 0 if validate_files(args.files, load_parameters(args)) else 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Simulation of task scheduling on multiple servers")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_command(name, function, description):
+        command = commands.add_parser(name, help=description, description=description)
+        command.set_defaults(function=function)
+        command.add_argument('--input', default='input.ini', help="input file, input.ini by default")
+        for option, kind in OVERRIDES:
+            command.add_argument('--' + option.replace('_', '-'), dest=option, type=kind,
+                                 help="override " + option + " of the input file")
+        return command
+
+    command = add_command('run', run, "schedule the instance, write the results and optionally plot them")
+    command.add_argument('--algorithms', nargs='+', default=list(ALGORITHMS), choices=list(ALGORITHMS))
+    command.add_argument('--log-level', default='warnings', choices=list(LOG_LEVELS))
+    command.add_argument('--stats', action='store_true', help="print the per-phase timers and counters")
+    command.add_argument('--write', action=argparse.BooleanOptionalAction, default=True,
+                         help="write the results_<algorithm>.txt files")
+    command.add_argument('--plot-dir', help="write the plots to this directory, matplotlib is not needed otherwise")
+    command.add_argument('--show', action='store_true', help="show the plots in windows")
+
+    command = add_command('sweep', run_sweep, "run the SWEEP grid of the input file across a process pool")
+    command.add_argument('--algorithms', nargs='+', choices=list(ALGORITHMS))
+    command.add_argument('--workers', type=int)
+    command.add_argument('--output', default='sweep_results.txt')
+
+    command = commands.add_parser('plot', help="plot result files",
+                                  description="plot result files, in windows unless --plot-dir is given")
+    command.set_defaults(function=run_plot)
+    command.add_argument('files', nargs='+')
+    command.add_argument('--plot-dir')
+
+    command = add_command('validate', run_validate, "check result files against the instance")
+    command.add_argument('files', nargs='+')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.function(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
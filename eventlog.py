@@ -0,0 +1,92 @@
+import sys
+import numpy as np
+
+# Kinds of records
+ASSIGNMENT, DEADLINE_MISS, POWER_WARNING, NO_SERVER, READY_SET, REJECTION, STALL = range(7)
+NAMES = ('assignment', 'deadline_miss', 'power_warning', 'no_server', 'ready_set', 'rejection', 'stall')
+
+# Verbosity levels, each level records the kinds of the levels below it
+OFF, WARNINGS, DECISIONS, DEBUG = range(4)
+LEVELS = {ASSIGNMENT: DECISIONS, DEADLINE_MISS: WARNINGS, POWER_WARNING: WARNINGS, NO_SERVER: DECISIONS,
+          READY_SET: DEBUG, REJECTION: WARNINGS, STALL: WARNINGS}
+
+RECORD = np.dtype([('kind', np.int8), ('time', np.float64), ('task', np.int64), ('server', np.int64),
+                   ('value', np.float64)])
+
+# Text of each kind of record, value is the end time, the delay, the power draw or the number of ready tasks
+MESSAGES = {ASSIGNMENT: "Task {task} assigned to server {server} start at: {time:.15g} end at: {value}",
+            DEADLINE_MISS: "!!! Task {task} has missed its deadline by {value} !!!",
+            POWER_WARNING: " !!! WARNING !!! : Power exceeded system capacity at time: {time:.15g} draw: {value}",
+            NO_SERVER: "No available servers for task: {task} at time: {time:.15g}",
+            READY_SET: "Ready tasks at time: {time:.15g}: {value:.0f}",
+            REJECTION: "!!! Task {task} rejected at time: {time:.15g}, it exceeds the power or energy cap !!!",
+            STALL: "Task {task} can't be scheduled, no running task left to release it"}
+
+
+class EventLog:
+    """
+    # Buffered event sink of the schedulers
+    # Records are written in a preallocated structured array and flushed in bulk as text, csv or binary
+    (the raw RECORD array) to the output, stdout by default
+    # The schedulers test the boolean of a kind before building a record, so a disabled kind costs one test
+    """
+
+    def __init__(self, level=DECISIONS, output=None, fmt='text', capacity=1 << 16):
+        self.level = level
+        self.output = output  # File name or file object
+        self.fmt = fmt
+        self.buffer = np.empty(capacity, dtype=RECORD)
+        self.size = 0
+        self.assignments = level >= LEVELS[ASSIGNMENT]
+        self.deadline_misses = level >= LEVELS[DEADLINE_MISS]
+        self.power_warnings = level >= LEVELS[POWER_WARNING]
+        self.no_server = level >= LEVELS[NO_SERVER]
+        self.ready_sets = level >= LEVELS[READY_SET]
+        self.rejections = level >= LEVELS[REJECTION]
+        self.stalls = level >= LEVELS[STALL]
+        self.__started = False  # The output file is truncated by the first flush
+
+    def record(self, kind, time, task=-1, server=-1, value=0.0):
+        if self.size == len(self.buffer):
+            self.flush()
+        self.buffer[self.size] = (kind, time, task, server, value)
+        self.size += 1
+
+    def records(self):
+        return self.buffer[:self.size]
+
+    def flush(self):
+        if not self.size:
+            return
+        records = self.records()
+        if self.fmt == 'binary':
+            self.__write(records.tobytes(), 'b')
+        elif self.fmt == 'csv':
+            lines = [] if self.__started else ["event,time,task,server,value\n"]
+            names = np.array(NAMES)[records['kind']]
+            lines += ["%s,%r,%d,%d,%r\n" % row for row in
+                      zip(names, records['time'].tolist(), records['task'].tolist(), records['server'].tolist(),
+                          records['value'].tolist())]
+            self.__write("".join(lines), '')
+        else:
+            self.__write("".join(MESSAGES[kind].format(time=time, task=task, server=server, value=value) + "\n"
+                                 for kind, time, task, server, value in records.tolist()), '')
+        self.size = 0
+
+    def __write(self, data, mode):
+        if self.output is None:
+            sys.stdout.write(data)
+        elif isinstance(self.output, str):
+            with open(self.output, ('a' if self.__started else 'w') + mode) as f:
+                f.write(data)
+        else:
+            self.output.write(data)
+        self.__started = True
+
+
+def read_binary_log(file_name):
+    """
+    # Load a log flushed with fmt='binary'
+    :return: Structured array of RECORD
+    """
+    return np.fromfile(file_name, dtype=RECORD)
@@ -0,0 +1,82 @@
+import os
+import sys
+import numpy as np
+
+
+def generate_tasks(n_tasks, seed=0, periodic_ratio=0.1, max_predecessors=3, layer_size=None):
+    """
+    # Random layered DAG plus a mix of independent periodic tasks
+    # Tasks are numbered layer by layer and their arrival dates never decrease with their id, so a
+    predecessor always arrives before its successors
+    # The deadline is the arrival date plus 1.5 to 4 times the units of work
+    :return: (jobs, dependencies) -> (n, 6) array of (id, arrival date, units of work, deadline, period, power)
+                                     and (m, 2) array of (predecessor id, successor id)
+    """
+    rng = np.random.default_rng(seed)
+    tid = np.arange(n_tasks)
+    unit_of_work = rng.integers(1, 21, n_tasks)
+    slack = (unit_of_work * rng.uniform(1.5, 4, n_tasks)).astype(np.int64)
+    power = rng.integers(5, 101, n_tasks)
+    periodic = rng.random(n_tasks) < periodic_ratio
+    period = np.where(periodic, rng.choice([10, 20, 25, 50, 100], n_tasks), 0)
+    arrival_date = np.sort(rng.integers(0, max(1, n_tasks // 10), n_tasks))
+    deadline = arrival_date + slack  # The schedulers read the deadline as an absolute time
+
+    # Layers of the DAG over the aperiodic tasks, each task depends on tasks of the previous layer
+    dag = tid[~periodic]
+    layer_size = layer_size or max(1, int(np.sqrt(len(dag))))
+    predecessors = []
+    successors = []
+    for k in range(1, max_predecessors + 1):
+        successor = dag[layer_size:]
+        layer_start = (np.arange(layer_size, len(dag)) // layer_size - 1) * layer_size
+        predecessor = dag[layer_start + rng.integers(0, layer_size, len(successor))]
+        keep = rng.random(len(successor)) < 1 / k
+        predecessors.append(predecessor[keep])
+        successors.append(successor[keep])
+    dependencies = np.unique(np.column_stack((np.concatenate(predecessors), np.concatenate(successors))), axis=0)
+    jobs = np.column_stack((tid, arrival_date, unit_of_work, deadline, period, power))
+    return jobs, dependencies.reshape(-1, 2)
+
+
+def generate_servers(n_servers, seed=0):
+    """
+    # Heterogeneous fleet: static power, performance, 3 or 4 frequency levels and local power cap
+    :return: List of (id, static power, performance, frequencies, local power cap)
+    """
+    rng = np.random.default_rng(seed)
+    levels = (1, 1.5, 2, 3)
+    servers = []
+    for sid in range(n_servers):
+        static_power = int(rng.integers(10, 61))
+        frequencies = levels if rng.random() < 0.5 else (1, 2, 3)
+        servers.append((sid, static_power, int(rng.integers(1, 5)), frequencies,
+                        static_power + int(rng.integers(100, 201))))
+    return servers
+
+
+def write_instance(directory, n_tasks, n_servers, seed=0, **options):
+    """
+    # Write a generated instance in the formats read by Parser
+    :return: Dictionary of the input parameters pointing to the written files
+    """
+    os.makedirs(directory, exist_ok=True)
+    jobs, dependencies = generate_tasks(n_tasks, seed, **options)
+    params = {'job_file': os.path.join(directory, 'jobs.txt'),
+              'server_file': os.path.join(directory, 'servers.txt'),
+              'dependency_file': os.path.join(directory, 'dependencies.txt')}
+    np.savetxt(params['job_file'], jobs, fmt='%d',
+               header='idjob arrival date, units of work, deadline, period, power')
+    np.savetxt(params['dependency_file'], dependencies, fmt='%d - %d',
+               header='task0 - task1 : task1 depends on task0')
+    with open(params['server_file'], 'w') as f:
+        f.write("#idserver static_power, performance, frequencies, local_power_cap\n")
+        for sid, static_power, performance, frequencies, local_power_cap in generate_servers(n_servers, seed):
+            f.write("%d %d %d (%s) %d\n" % (sid, static_power, performance, " ".join(str(v) for v in frequencies),
+                                            local_power_cap))
+    return params
+
+
+if __name__ == "__main__":
+    # python3 generator.py directory n_tasks n_servers [seed]
+    write_instance(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4]) if len(sys.argv) > 4 else 0)
@@ -0,0 +1,88 @@
+import cProfile
+import io
+import json
+import pstats
+from time import perf_counter
+
+
+class Instrumentation:
+    """
+    # Per-phase timers and counters of a scheduler
+    # The schedulers test `enabled` before measuring anything, so a disabled instance costs one test per phase
+    # Phases: ready_set, server_selection, server_update, periodic_release, output_writing and schedule
+    :argument enabled -> collect the timers and counters
+              profile -> run the calls made through call() under cProfile
+    """
+
+    def __init__(self, enabled=True, profile=False):
+        self.enabled = enabled
+        self.profile = profile
+        self.timers = dict()  # phase -> seconds
+        self.calls = dict()  # phase -> number of measures
+        self.counters = dict()  # name -> value
+        self.peaks = dict()  # name -> highest value seen
+        self.profile_stats = None  # pstats.Stats of the last profiled call
+
+    def stop(self, phase, start):
+        """
+        # Add the time elapsed since start (a perf_counter value) to the phase
+        """
+        self.timers[phase] = self.timers.get(phase, 0) + perf_counter() - start
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def peak(self, name, value):
+        if value > self.peaks.get(name, value - 1):
+            self.peaks[name] = value
+
+    def call(self, function, *args, **kwargs):
+        """
+        # Run function, timed as the schedule phase and under cProfile when profile is set
+        :return: Return value of function
+        """
+        if not self.enabled:
+            return function(*args, **kwargs)
+        profiler = cProfile.Profile() if self.profile else None
+        start = perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self.profile_stats = pstats.Stats(profiler)
+            self.stop('schedule', start)
+
+    def profile_report(self, limit=20, sort='cumulative'):
+        """
+        # Text of the most expensive functions of the last profiled call
+        """
+        if self.profile_stats is None:
+            return ""
+        stream = io.StringIO()
+        self.profile_stats.stream = stream
+        self.profile_stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def report(self):
+        """
+        :return: Dictionary of the timers (seconds), number of measures per phase, counters and peaks
+        """
+        return {'timers': dict(self.timers),
+                'calls': dict(self.calls),
+                'counters': dict(self.counters),
+                'peaks': dict(self.peaks)}
+
+    def to_json(self, file_name=None):
+        """
+        # JSON report, written to file_name when given
+        :return: JSON string
+        """
+        text = json.dumps(self.report(), indent=1)
+        if file_name is not None:
+            with open(file_name, 'w') as f:
+                f.write(text)
+        return text
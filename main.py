@@ -8,13 +8,29 @@ data = Parser(parameters)
 max_time = int(parameters['max_timesteps'])
 # Global power capacity available
 power_cap = int(parameters['power_cap'])
+# Total energy allowed, the tasks that would exceed it are rejected
+energy_cap = float(parameters['energy_cap'])
 # Selected frequency 1,2 or 3:
 frq = int(parameters['frequency'])
-# initializing scheduler for each algorithm
-wave_front = WaveFront(tasks=deepcopy(data.tasks), servers=deepcopy(data.servers), power_cap=power_cap, frequency=frq)
-fifo = FIFO(tasks=deepcopy(data.tasks), servers=deepcopy(data.servers), power_cap=power_cap, frequency=frq)
-cpm = CPM(tasks=deepcopy(data.tasks), servers=deepcopy(data.servers), power_cap=power_cap, frequency=frq)
+# Keep the power draw under power_cap instead of only warning about it, optional
+enforce_power_cap = configparser.ConfigParser.BOOLEAN_STATES[parameters.get('enforce_power_cap', 'no').lower()]
+# HEFT chooses the frequency of every task to save energy under the deadlines instead, optional
+energy_aware = configparser.ConfigParser.BOOLEAN_STATES[parameters.get('energy_aware', 'no').lower()]
+# initializing scheduler for each algorithm, each one gets its own copy of the task columns
+tasks, servers = data.copy()
+wave_front = WaveFront(tasks=tasks, servers=servers, power_cap=power_cap, frequency=frq, energy_cap=energy_cap,
+                       enforce_power_cap=enforce_power_cap)
+tasks, servers = data.copy()
+fifo = FIFO(tasks=tasks, servers=servers, power_cap=power_cap, frequency=frq, energy_cap=energy_cap,
+            enforce_power_cap=enforce_power_cap)
+tasks, servers = data.copy()
+cpm = CPM(tasks=tasks, servers=servers, power_cap=power_cap, frequency=frq, energy_cap=energy_cap,
+          enforce_power_cap=enforce_power_cap)
+tasks, servers = data.copy()
+heft = HEFT(tasks=tasks, servers=servers, power_cap=power_cap, frequency=frq, energy_cap=energy_cap,
+            energy_aware=energy_aware, enforce_power_cap=enforce_power_cap)
 # Build scheduling tables
 wave_front.build_wavefront_table(max_time=max_time)
 fifo.build_fifo_table()
 cpm.build_cpm_table()
+heft.build_heft_table()
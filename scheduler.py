@@ -1,5 +1,17 @@
 import configparser
-from copy import deepcopy
+import hashlib
+import heapq
+import os
+import shutil
+import warnings
+from copy import copy
+from itertools import count
+from math import ceil, lcm
+from random import Random
+from time import perf_counter
+import numpy as np
+from eventlog import *
+from instrumentation import *
 from Plotter import *
 
 
@@ -17,118 +29,1028 @@ def load_params(input_file):
     return param_dict
 
 
+def column(name):
+    """
+    # Property reading and writing one cell of a store column for the row of the view
+    """
+
+    def get(self):
+        return getattr(self.store, name).item(self.index)
+
+    def set(self, value):
+        store = self.store
+        if store.shared:
+            store.unshare(name)
+        getattr(store, name)[self.index] = value
+
+    return property(get, set)
+
+
+def csr(rows, values, size):
+    """
+    # Compressed sparse rows: values of row i are values[ptr[i]:ptr[i + 1]], in their original order
+    :return: (ptr, values)
+    """
+    ptr = np.zeros(size + 1, dtype=np.int64)
+    ptr[1:] = np.cumsum(np.bincount(rows, minlength=size))
+    return ptr, values[np.argsort(rows, kind='stable')]
+
+
+class TaskStore:
+    """
+    # Struct of arrays holding every task of an instance, one row per task
+    # Dependencies are kept in CSR arrays of task ids, rows added by copy_row (periodic repeats)
+    share the dependencies of the row they were copied from
+    # Columns frozen by a snapshot are shared with it and copied on their next write
+    """
+    rows = ('tid', 'arrival_date', 'unit_of_work', 'deadline', 'period', 'power', 'repeat',
+            'running', 'server_id', 'critical_time', 'edge_row')
+
+    def __init__(self, tid, arrival_date, unit_of_work, deadline, period, power, repeat, dependencies=()):
+        """
+        :argument dependencies -> (predecessor tid, successor tid) pairs
+        """
+        self.size = len(tid)
+        self.tid = np.array(tid, dtype=np.int64)
+        self.arrival_date = np.array(arrival_date, dtype=np.int64)
+        self.unit_of_work = np.array(unit_of_work, dtype=np.int64)
+        self.deadline = np.array(deadline, dtype=np.int64)
+        self.period = np.array(period, dtype=np.int64)
+        self.power = np.array(power, dtype=np.int64)
+        self.repeat = np.array(repeat, dtype=np.int64)
+        self.running = np.zeros(self.size, dtype=bool)
+        self.server_id = np.full(self.size, -1, dtype=np.int64)  # -1 when the task is not assigned
+        self.critical_time = np.zeros(self.size, dtype=np.int64)
+        self.edge_row = np.arange(self.size, dtype=np.int64)  # row of the CSR dependencies
+        self.shared = set()  # Columns shared with a snapshot
+
+        edges = np.array(dependencies, dtype=np.int64).reshape(-1, 2)
+        by_tid = np.argsort(self.tid, kind='stable')
+        rows = by_tid[np.searchsorted(self.tid[by_tid], edges)]
+        self.pred_ptr, self.pred_idx = csr(rows[:, 1], edges[:, 0], self.size)
+        self.succ_ptr, self.succ_idx = csr(rows[:, 0], edges[:, 1], self.size)
+
+    arrays = rows + ('pred_ptr', 'pred_idx', 'succ_ptr', 'succ_idx')
+
+    def tasks(self):
+        return [Task(self, i) for i in range(self.size)]
+
+    def save(self, directory):
+        os.makedirs(directory)
+        for name in self.arrays:
+            np.save(os.path.join(directory, name + '.npy'), getattr(self, name)[:self.size]
+                    if name in self.rows else getattr(self, name))
+
+    @classmethod
+    def load(cls, directory):
+        """
+        # Memory map a saved store, the pages are copied on write so the files are never modified
+        """
+        store = cls.__new__(cls)
+        for name in cls.arrays:
+            setattr(store, name, np.load(os.path.join(directory, name + '.npy'), mmap_mode='c'))
+        store.size = len(store.tid)
+        store.shared = set()
+        return store
+
+    def copy(self):
+        """
+        # Independent copy of the task rows, the read only dependency arrays are shared
+        """
+        store = copy(self)
+        for name in self.rows:
+            setattr(store, name, getattr(self, name)[:self.size].copy())
+        store.shared = set()
+        return store
+
+    def edges(self, rows):
+        """
+        # Dependencies of the given rows, gathered from the CSR arrays in one pass
+        :return: (predecessor tids, successor rows) arrays
+        """
+        edge_rows = self.edge_row[rows]
+        counts = self.pred_ptr[edge_rows + 1] - self.pred_ptr[edge_rows]
+        offsets = np.repeat(self.pred_ptr[edge_rows] - (np.cumsum(counts) - counts), counts)
+        return self.pred_idx[offsets + np.arange(counts.sum())], np.repeat(rows, counts)
+
+    def take(self, rows):
+        """
+        # New store of the given rows, keeping the dependencies between them
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        predecessors, successors = self.edges(rows)
+        keep = np.isin(predecessors, self.tid[rows])
+        return TaskStore(self.tid[rows], self.arrival_date[rows], self.unit_of_work[rows], self.deadline[rows],
+                         self.period[rows], self.power[rows], self.repeat[rows],
+                         np.column_stack((predecessors[keep], self.tid[successors[keep]])))
+
+    def unshare(self, name):
+        """
+        # Copy on write: copy a column shared with a snapshot before writing in it
+        """
+        if name in self.shared:
+            self.shared.discard(name)
+            setattr(self, name, getattr(self, name).copy())
+
+    def freeze(self):
+        """
+        # State of the rows for a snapshot: the current columns, which are copied on their next write
+        """
+        self.shared = set(self.rows)
+        return self.size, {name: getattr(self, name) for name in self.rows}
+
+    def thaw(self, state):
+        """
+        # Restore the rows of a snapshot, its columns stay shared so it can be restored again
+        """
+        self.size, columns = state
+        for name, values in columns.items():
+            setattr(self, name, values)
+        self.shared = set(self.rows)
+
+    def copy_row(self, index):
+        """
+        # Append a copy of a row, the columns grow by doubling
+        :return: Index of the new row
+        """
+        if self.size == len(self.tid):
+            for name in self.rows:
+                setattr(self, name, np.resize(getattr(self, name), 2 * self.size))
+            self.shared = set()
+        for name in self.rows:
+            self.unshare(name)
+            col = getattr(self, name)
+            col[self.size] = col[index]
+        self.size += 1
+        return self.size - 1
+
+    def predecessor(self, index):
+        row = self.edge_row[index]
+        return self.pred_idx[self.pred_ptr[row]:self.pred_ptr[row + 1]].tolist()
+
+    def successor(self, index):
+        row = self.edge_row[index]
+        return self.succ_idx[self.succ_ptr[row]:self.succ_ptr[row + 1]].tolist()
+
+
 class Task:
-    def __init__(self, tid, arrival_date, predecessor, successor, unit_of_work, deadline, period, power, repeat):
-        self.tid = tid
-        self.arrival_date = arrival_date
-        self.predecessor = predecessor  # List of dependencies tasks []
-        self.successor = successor
-        self.unit_of_work = unit_of_work
-        self.deadline = deadline
-        self.period = period
-        self.power = power
-        self.repeat = repeat
-        self.running = False
-        self.server_id = None
-        self.critical_time = 0
+    """
+    # Lightweight view of one row of a TaskStore
+    """
+    __slots__ = ('store', 'index')
 
+    tid = column('tid')
+    arrival_date = column('arrival_date')
+    unit_of_work = column('unit_of_work')
+    deadline = column('deadline')
+    period = column('period')
+    power = column('power')
+    repeat = column('repeat')
+    running = column('running')
+    critical_time = column('critical_time')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    @property
+    def predecessor(self):
+        return self.store.predecessor(self.index)  # List of dependencies tasks []
+
+    @property
+    def successor(self):
+        return self.store.successor(self.index)
+
+    @property
+    def server_id(self):
+        server_id = self.store.server_id.item(self.index)
+        return None if server_id < 0 else server_id
+
+    @server_id.setter
+    def server_id(self, server_id):
+        if self.store.shared:
+            self.store.unshare('server_id')
+        self.store.server_id[self.index] = -1 if server_id is None else server_id
+
+    def copy(self):
+        """
+        # New task in the same store with the same values
+        """
+        return Task(self.store, self.store.copy_row(self.index))
+
+    def instance(self, k):
+        """
+        # k-th instance of a periodic task used as a template, it arrives at arrival_date + k * period
+        and only gets its own row when it is released
+        """
+        instance = self.copy()
+        instance.repeat = self.repeat - k
+        instance.arrival_date = self.arrival_date + k * self.period
+        instance.deadline = self.deadline + k * self.period
+        instance.running = False
+        instance.server_id = None
+        return instance
+
+
+def new_task(tid, arrival_date, unit_of_work, deadline, period=0, power=0, repeat=0, predecessors=()):
+    """
+    # Task in a store of its own, for the online mode: the store is freed with the last instance of the task
+    :argument predecessors -> tid of the tasks it depends on, its successors are the tasks submitted later
+    """
+    store = TaskStore.__new__(TaskStore)
+    store.size = 1
+    store.shared = set()
+    values = (tid, arrival_date, unit_of_work, deadline, period, power, repeat, False, -1, 0, 0)
+    for name, value in zip(TaskStore.rows, values):
+        setattr(store, name, np.array([value], dtype=bool if name == 'running' else np.int64))
+    store.pred_ptr = np.array([0, len(predecessors)], dtype=np.int64)
+    store.pred_idx = np.array(predecessors, dtype=np.int64)
+    store.succ_ptr = np.zeros(2, dtype=np.int64)
+    store.succ_idx = store.succ_ptr[:0]
+    return Task(store, 0)
+
+
+class ServerStore:
+    """
+    # Struct of arrays holding the static description of the servers, one row per server
+    # The frequencies of each server are kept in CSR arrays
+    """
 
-class Server:
     def __init__(self, server_id, static_power, performance, frequency, local_power_cap):
-        self.server_id = server_id
-        self.static_power = static_power
-        self.performance = performance
-        self.frequency = frequency  # List of frequency []
-        self.local_power_cap = local_power_cap
+        self.size = len(server_id)
+        self.server_id = np.array(server_id, dtype=np.int64)
+        self.static_power = np.array(static_power, dtype=np.int64)
+        self.performance = np.array(performance, dtype=np.int64)
+        self.local_power_cap = np.array(local_power_cap, dtype=np.int64)
+        self.freq_ptr = np.zeros(self.size + 1, dtype=np.int64)
+        self.freq_ptr[1:] = np.cumsum([len(f) for f in frequency])
+        self.freq_values = np.array([f for frequencies in frequency for f in frequencies], dtype=np.float64)
+
+    arrays = ('server_id', 'static_power', 'performance', 'local_power_cap', 'freq_ptr', 'freq_values')
+
+    def servers(self):
+        return [Server(self, i) for i in range(self.size)]
+
+    def save(self, directory):
+        os.makedirs(directory)
+        for name in self.arrays:
+            np.save(os.path.join(directory, name + '.npy'), getattr(self, name))
+
+    @classmethod
+    def load(cls, directory):
+        store = cls.__new__(cls)
+        for name in cls.arrays:
+            setattr(store, name, np.load(os.path.join(directory, name + '.npy'), mmap_mode='c'))
+        store.size = len(store.server_id)
+        return store
+
+    def frequency(self, index):
+        return self.freq_values[self.freq_ptr[index]:self.freq_ptr[index + 1]].tolist()
+
+    def take(self, indices):
+        """
+        # New store of the given servers
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        return ServerStore(self.server_id[indices], self.static_power[indices], self.performance[indices],
+                           [self.frequency(i) for i in indices.tolist()], self.local_power_cap[indices])
+
+
+class Server:
+    """
+    # Lightweight view of one row of a ServerStore, the scheduling state of the server is kept in the view
+    """
+    __slots__ = ('store', 'index', 'available_after', 'available', 'current_task')
+
+    server_id = column('server_id')
+    static_power = column('static_power')
+    performance = column('performance')
+    local_power_cap = column('local_power_cap')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
         self.available_after = 0
         self.available = True
         self.current_task = None
 
+    @property
+    def frequency(self):
+        return self.store.frequency(self.index)  # List of frequency []
+
+
+CACHE_VERSION = b'1'  # Change it when the layout of the stores changes
+
+
+def read_columns(file_name, columns, delimiter=None):
+    """
+    # Vectorized parsing of a file of integer columns, the first line is the header
+    :return: 2D array or None when a line can't be parsed
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')  # Empty files
+            data = np.loadtxt(file_name, dtype=np.int64, skiprows=1, comments='#', delimiter=delimiter, ndmin=2)
+    except ValueError:
+        return None
+    if not data.size:
+        return np.empty((0, columns), dtype=np.int64)
+    return data if data.shape[1] == columns else None
+
+
+def hash_files(file_names):
+    digest = hashlib.sha256(CACHE_VERSION)
+    for file_name in file_names:
+        with open(file_name, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
 
 class Parser:
+    """
+    # Parse the job, dependency and server files into a TaskStore and a ServerStore
+    # The stores of an instance are cached in cache_dir, keyed by the hash of the files content,
+    and memory mapped on the next runs
+    """
+
     def __init__(self, params):
-        predecessor = dict()
-        successor = dict()
-        tasks = []
-        servers = []
-        try:
-            with open(params['job_file']) as f:
-                next(f)
-                for line in f:
-                    try:
-                        tmp = line.rstrip().split(" ")
-                        tmp = list(map(int, tmp))
-                        tid = tmp[0]
-                        arrival_date = tmp[1]
-                        uow = tmp[2]
-                        deadline = tmp[3]
-                        period = tmp[4]
-                        power = tmp[5]
-                        successor[tid] = []
-                        predecessor[tid] = []
-                        repeat = 0
-                        if period > 0:
-                            repeat = int(params['repeat']) - 1
-                        tasks.append(
-                            Task(tid, arrival_date, [], [], uow, deadline, period, power, repeat))
-                    except ValueError:
-                        pass
-                    except Exception as exp:
-                        print(exp)
-        except FileNotFoundError:
-            print("Couldn't find", params['job_file'], "file")
-            print("try to check the file or try to use the full path in the input.ini")
-            exit(1)
+        files = [params['job_file'], params['dependency_file'], params['server_file']]
+        for file_name in files:
+            if not os.path.isfile(file_name):
+                print("Couldn't find", file_name, "file")
+                print("try to check the file or try to use the full path in the input.ini")
+                exit(1)
+        cache = os.path.join(params.get('cache_dir', '.instance_cache'), hash_files(files))
+        if os.path.isdir(cache):
+            self.task_store = TaskStore.load(os.path.join(cache, 'tasks'))
+            self.server_store = ServerStore.load(os.path.join(cache, 'servers'))
+        else:
+            self.task_store = self.__parse_tasks(params['job_file'], params['dependency_file'])
+            self.server_store = self.__parse_servers(params['server_file'])
+            self.__save(cache)
+
+        repeat = int(params['repeat']) - 1
+        self.task_store.repeat[:] = np.where(self.task_store.period > 0, repeat, 0)
+        # critical time of the tasks without successor:
+        leaves = np.diff(self.task_store.succ_ptr) == 0
+        self.task_store.critical_time[:] = np.where(leaves, self.task_store.unit_of_work, 0)
+
+    @property
+    def tasks(self):
+        return self.task_store.tasks()
+
+    @property
+    def servers(self):
+        return self.server_store.servers()
 
+    def __save(self, cache):
+        tmp = cache + '.tmp%d' % os.getpid()
         try:
-            with open(params['dependency_file']) as f:
-                next(f)
-                for line in f:
-                    try:
-                        tmp = line.rstrip().replace(' ', '').split("-")
-                        tmp = list(map(int, tmp))
-                        predecessor[tmp[1]].append(tmp[0])
-                        successor[tmp[0]].append(tmp[1])
-
-                    except ValueError:
-                        pass
-                    except Exception as exp:
-                        print(exp)
-        except FileNotFoundError:
-            print("Couldn't find", params['dependency_file'], "file")
-            print("try to check the file or try to use the full path in the input.ini")
-            exit(1)
-
-        # update tasks dependencies:
+            self.task_store.save(os.path.join(tmp, 'tasks'))
+            self.server_store.save(os.path.join(tmp, 'servers'))
+            os.replace(tmp, cache)
+        except OSError as exp:
+            if not os.path.isdir(cache):  # Not cached by a concurrent run either
+                print("Couldn't cache the instance:", exp)
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def __parse_tasks(self, job_file, dependency_file):
+        def parse_job(line):
+            tmp = list(map(int, line.rstrip().split(" ")))
+            return tmp[0], tmp[1], tmp[2], tmp[3], tmp[4], tmp[5]
+
+        def parse_dependency(line):
+            tmp = list(map(int, line.rstrip().replace(' ', '').split("-")))
+            return tmp[0], tmp[1]
+
+        jobs = read_columns(job_file, 6)
+        if jobs is None:
+            jobs = np.array(self.__parse_lines(job_file, parse_job), dtype=np.int64).reshape(-1, 6)
+        dependencies = read_columns(dependency_file, 2, delimiter='-')
+        if dependencies is None:
+            dependencies = np.array(self.__parse_lines(dependency_file, parse_dependency), dtype=np.int64).reshape(-1, 2)
+        known = np.isin(dependencies, jobs[:, 0]).all(axis=1)
+        for predecessor, successor in dependencies[~known]:
+            print("Unknown task in dependency", predecessor, "-", successor)
+        return TaskStore(*jobs.T, np.zeros(len(jobs), dtype=np.int64), dependencies=dependencies[known])
+
+    def __parse_servers(self, server_file):
+        def parse_server(line):
+            tmp = line.rstrip().split(" ")
+            frequencies = (line[line.index('(') + 1:line.index(')')]).split(" ")
+            return int(tmp[0]), int(tmp[1]), int(tmp[2]), list(map(float, frequencies)), int(tmp[-1])
+
+        servers = self.__parse_lines(server_file, parse_server)
+        return ServerStore(*(list(zip(*servers)) or [()] * 5))
+
+    @staticmethod
+    def __parse_lines(file_name, parse_line):
+        """
+        # Line by line parser used for the server file and for the files with malformed lines, which are skipped
+        """
+        rows = []
+        with open(file_name) as f:
+            next(f)
+            for line in f:
+                try:
+                    rows.append(parse_line(line))
+                except ValueError:
+                    pass
+                except Exception as exp:
+                    print(exp)
+        return rows
+
+    def copy(self):
+        """
+        # Tasks and servers for a new scheduler, the task columns are copied instead of the objects
+        :return: (tasks, servers)
+        """
+        return self.task_store.copy().tasks(), self.server_store.servers()
+
+
+class EventQueue:
+    """
+    # Priority queue of the discrete-event simulation
+    # Task arrivals (first release and periodic re-release) and task completions are kept
+    in two heaps so a scheduler can jump straight to the next time step where something happens
+    # Arrivals at the same date are ordered by their insertion order, completions come
+    before arrivals at the same date like update_servers does before the ready tasks are computed
+    """
+
+    def __init__(self):
+        self.arrivals = []  # heap of (arrival_date, order, task)
+        self.completions = []  # heap of (time, order, server)
+        self.__order = count()
+
+    def push_arrival(self, task):
+        heapq.heappush(self.arrivals, (task.arrival_date, next(self.__order), task))
+
+    def push_completion(self, time, server):
+        heapq.heappush(self.completions, (time, next(self.__order), server))
+
+    def peek_arrival(self):
+        return self.arrivals[0][2] if self.arrivals else None
+
+    def pop_arrival(self):
+        arrival_date, order, task = heapq.heappop(self.arrivals)
+        return order, task
+
+    def restore_arrival(self, order, task):
+        heapq.heappush(self.arrivals, (task.arrival_date, order, task))
+
+    def next_completion(self):
+        return self.completions[0][0] if self.completions else None
+
+    def next_time(self):
+        times = [heap[0][0] for heap in (self.arrivals, self.completions) if heap]
+        return min(times) if times else None
+
+    def snapshot(self):
+        return self.arrivals[:], self.completions[:], next(self.__order)
+
+    def restore(self, state):
+        arrivals, completions, order = state
+        self.arrivals = arrivals[:]
+        self.completions = completions[:]
+        self.__order = count(order)
+
+    def pop_completions(self, time):
+        """
+        :return: List of (completion time, server) up to time
+        """
+        completions = []
+        while self.completions and self.completions[0][0] <= time:
+            completion_time, order, server = heapq.heappop(self.completions)
+            completions.append((completion_time, server))
+        return completions
+
+
+class DependencyTracker:
+    """
+    # Dependency tracking shared by the schedulers
+    # Keeps the number of unfinished predecessors of every task and a ready queue of the
+    unblocked tasks ordered by arrival date, a completed task only visits its own successors
+    :argument ready_queue -> keep the ready queue, schedulers with their own arrival queue go without it
+    """
+
+    def __init__(self, tasks, ready_queue=True):
+        self.remaining = {task.tid: len(task.predecessor) for task in tasks}  # tid -> unfinished predecessors
+        self.blocked = dict()  # tid -> (order, task) waiting for its predecessors
+        self.ready = []  # heap of (arrival_date, order, task) with no unfinished predecessor
+        self.ready_queue = ready_queue
+        self.completed = set()
+        self.cancelled = set()  # tid of the tasks that can never run, a predecessor was rejected
+        self.successors = dict()  # tid -> successors submitted after it, in online mode
+        self.__order = count()
         for task in tasks:
-            task.predecessor = predecessor.get(task.tid)
-            task.successor = successor.get(task.tid)
-            if not task.successor:
-                task.critical_time = task.unit_of_work
-        try:
-            with open(params['server_file']) as f:
-                next(f)
-                for line in f:
-                    try:
-                        tmp = line.rstrip().split(" ")
-                        sid = int(tmp[0])
-                        static_power = int(tmp[1])
-                        performance = int(tmp[2])
-                        frequencies = (line[line.index('(') + 1:line.index(')')]).split(" ")
-                        frequencies = list(map(float, frequencies))
-                        local_power_cap = int(tmp[-1])
-                        servers.append(Server(sid, static_power, performance, frequencies, local_power_cap))
-                    except ValueError:
-                        pass
-                    except Exception as exp:
-                        print(exp)
-        except FileNotFoundError:
-            print("Couldn't find", params['server_file'], "file")
-            print("try to check the file or try to use the full path in the input.ini")
-            exit(1)
-
-        self.tasks = tasks
+            self.add(task)
+
+    def add(self, task):
+        """
+        # Register a task to schedule, tasks added later come after the others at the same time step
+        """
+        order = next(self.__order)
+        if self.remaining.get(task.tid, 0) > 0:
+            self.blocked[task.tid] = (order, task)
+        elif self.ready_queue:
+            heapq.heappush(self.ready, (task.arrival_date, order, task))
+
+    def submit(self, task):
+        """
+        # Register a task arriving in online mode, it only waits for its predecessors still tracked,
+        the ones never submitted or already evicted count as completed
+        """
+        remaining = 0
+        for task_id in task.predecessor:
+            if task_id in self.remaining and task_id not in self.completed:
+                self.successors.setdefault(task_id, []).append(task.tid)
+                remaining += 1
+        self.remaining[task.tid] = remaining
+        self.add(task)
+
+    def snapshot(self):
+        return (dict(self.remaining), dict(self.blocked), self.ready[:], set(self.completed), set(self.cancelled),
+                {task_id: successors[:] for task_id, successors in self.successors.items()}, next(self.__order))
+
+    def restore(self, state):
+        """
+        # Back to a snapshot, the containers are copied again so it can be restored more than once
+        """
+        self.remaining, self.blocked, self.ready, self.completed, self.cancelled, successors, order = state
+        self.remaining = dict(self.remaining)
+        self.blocked = dict(self.blocked)
+        self.ready = self.ready[:]
+        self.completed = set(self.completed)
+        self.cancelled = set(self.cancelled)
+        self.successors = {task_id: successors[:] for task_id, successors in successors.items()}
+        self.__order = count(order)
+
+    def expire(self, queued):
+        """
+        # Forget the cancelled tasks that are no longer queued, in online mode
+        :argument queued -> tid of the tasks still waiting in the arrival queues
+        """
+        self.cancelled.intersection_update(queued)
+
+    def forget(self, task_id):
+        """
+        # Evict a task whose last instance completed
+        """
+        self.remaining.pop(task_id, None)
+        self.completed.discard(task_id)
+        self.cancelled.discard(task_id)
+
+    def is_blocked(self, task):
+        return self.remaining.get(task.tid, 0) > 0
+
+    def complete(self, task):
+        """
+        # Mark the task as finished, only its first instance releases the successors
+        :return: List of successor tasks that have no remaining predecessor
+        """
+        if task.tid in self.completed:
+            return []
+        self.completed.add(task.tid)
+        released = []
+        successors = task.successor
+        if task.tid in self.successors:
+            successors = dict.fromkeys(successors + self.successors.pop(task.tid))
+        for task_id in successors:
+            if task_id not in self.remaining:  # Not submitted yet in online mode
+                continue
+            self.remaining[task_id] -= 1
+            if self.remaining[task_id] == 0 and task_id in self.blocked:
+                order, successor = self.blocked.pop(task_id)
+                if self.ready_queue:
+                    heapq.heappush(self.ready, (successor.arrival_date, order, successor))
+                released.append(successor)
+        return released
+
+    def cancel(self, task):
+        """
+        # A rejected task never completes, so its successors and their own successors can never run
+        :return: List of the tid of the cancelled successors
+        """
+        self.cancelled.add(task.tid)
+        self.remaining.pop(task.tid, None)
+        cancelled = []
+        stack = task.successor + self.successors.pop(task.tid, [])
+        while stack:
+            task_id = stack.pop()
+            if task_id in self.cancelled or task_id in self.completed:
+                continue
+            self.cancelled.add(task_id)
+            self.remaining.pop(task_id, None)
+            cancelled.append(task_id)
+            stack.extend(self.successors.pop(task_id, ()))
+            if task_id in self.blocked:
+                stack.extend(self.blocked.pop(task_id)[1].successor)
+        return cancelled
+
+    def next_arrival(self):
+        return self.ready[0][0] if self.ready else None
+
+    def pop_ready(self, time):
+        """
+        # Pop the unblocked tasks that arrived before time
+        :return: List of tasks in the order they were added
+        """
+        tasks = []
+        while self.ready and self.ready[0][0] <= time:
+            tasks.append(heapq.heappop(self.ready)[1:])
+        tasks.sort(key=lambda entry: entry[0])
+        return [task for order, task in tasks]
+
+
+class ServerPool:
+    """
+    # Indexed view of the servers used for the server selection
+    # Two segment trees follow the order of the server list: the power headroom
+    (local_power_cap - static_power) of the free servers and the available_after of every server,
+    so the first fitting free server and the earliest available server are found in O(log s)
+    """
+
+    def __init__(self, servers):
         self.servers = servers
+        self.position = {server: i for i, server in enumerate(servers)}
+        self.size = 1
+        while self.size < len(servers):
+            self.size *= 2
+        self.headroom = [float('-inf')] * (2 * self.size)  # max headroom of the free servers in each node
+        self.earliest = [(float('inf'), i) for i in range(2 * self.size)]  # min (available_after, position)
+        for server in servers:
+            self.update(server)
+
+    def update(self, server):
+        """
+        # Refresh the trees after a change of server.available or server.available_after
+        """
+        i = self.position[server]
+        node = self.size + i
+        self.headroom[node] = server.local_power_cap - server.static_power if server.available else float('-inf')
+        self.earliest[node] = (server.available_after, i)
+        node //= 2
+        while node:
+            self.headroom[node] = max(self.headroom[2 * node], self.headroom[2 * node + 1])
+            self.earliest[node] = min(self.earliest[2 * node], self.earliest[2 * node + 1])
+            node //= 2
+
+    def first_fit(self, power):
+        """
+        # First free server in the list order whose local power cap accepts a task of the given power
+        :rtype: Server or None
+        """
+        if self.headroom[1] < power:
+            return None
+        node = 1
+        while node < self.size:
+            node = 2 * node if self.headroom[2 * node] >= power else 2 * node + 1
+        return self.servers[node - self.size]
+
+    def earliest_available(self):
+        """
+        # Server with the smallest available_after, the first one in the list order on ties
+        """
+        return self.servers[self.earliest[1][1]]
+
+
+class Gap:
+    """
+    # Free interval [start, end) of a server, node of a GapIndex
+    """
+    __slots__ = ('start', 'end', 'priority', 'left', 'right', 'longest')
+
+    def __init__(self, start, end, priority):
+        self.start = start
+        self.end = end
+        self.priority = priority
+        self.left = None
+        self.right = None
+        self.longest = end - start  # Longest gap of the subtree
+
+
+class GapIndex:
+    """
+    # Free gaps of one server, kept in a treap ordered by start where every node knows the longest gap
+    of its subtree, so the earliest gap fitting a task is found in O(log n) instead of scanning the schedule
+    """
+
+    def __init__(self, seed=0):
+        self.random = Random(seed)  # Priorities of the treap, they only change its shape
+        self.root = Gap(0, float('inf'), self.random.random())
+
+    @staticmethod
+    def __update(node):
+        node.longest = node.end - node.start
+        if node.left is not None and node.left.longest > node.longest:
+            node.longest = node.left.longest
+        if node.right is not None and node.right.longest > node.longest:
+            node.longest = node.right.longest
+
+    def __split(self, node, key):
+        """
+        :return: (gaps starting before key, gaps starting at or after key)
+        """
+        if node is None:
+            return None, None
+        if node.start < key:
+            node.right, right = self.__split(node.right, key)
+            self.__update(node)
+            return node, right
+        left, node.left = self.__split(node.left, key)
+        self.__update(node)
+        return left, node
+
+    def __merge(self, left, right):
+        if left is None:
+            return right
+        if right is None:
+            return left
+        if left.priority > right.priority:
+            left.right = self.__merge(left.right, right)
+            self.__update(left)
+            return left
+        right.left = self.__merge(left, right.left)
+        self.__update(right)
+        return right
+
+    def __pop_first(self, node):
+        if node.left is None:
+            return node.right
+        node.left = self.__pop_first(node.left)
+        self.__update(node)
+        return node
+
+    def __first_fit(self, node, earliest, duration):
+        """
+        # Leftmost gap starting after earliest with at least duration, the subtrees too short are skipped
+        """
+        if node is None or node.longest < duration:
+            return None
+        if node.start > earliest:
+            gap = self.__first_fit(node.left, earliest, duration)
+            if gap is not None:
+                return gap
+            if node.end - node.start >= duration:
+                return node
+        return self.__first_fit(node.right, earliest, duration)
+
+    def find(self, earliest, duration):
+        """
+        # Earliest start at or after earliest of a free interval of the given duration, the index is not modified
+        :return: (start, gap holding it)
+        """
+        node, gap = self.root, None
+        while node is not None:  # Last gap starting at or before earliest
+            if node.start <= earliest:
+                gap, node = node, node.right
+            else:
+                node = node.left
+        if gap is not None and gap.end - earliest >= duration:
+            return earliest, gap
+        # The last gap never ends so there is always one
+        gap = self.__first_fit(self.root, earliest, duration)
+        return gap.start, gap
+
+    def reserve(self, gap, start, end):
+        """
+        # Take [start, end) out of a gap returned by find
+        """
+        left, right = self.__split(self.root, gap.start)
+        right = self.__pop_first(right)  # The gap itself
+        middle = None
+        if gap.start < start:
+            middle = Gap(gap.start, start, self.random.random())
+        if end < gap.end:
+            middle = self.__merge(middle, Gap(end, gap.end, self.random.random()))
+        self.root = self.__merge(self.__merge(left, middle), right)
+
+
+class Step:
+    """
+    # Step of the draw starting at time and holding until the next step, node of a PowerTimeline
+    # add is pending for the whole subtree, high and low are the extremes of the subtree with add applied
+    """
+    __slots__ = ('time', 'draw', 'add', 'high', 'low', 'priority', 'left', 'right')
+
+    def __init__(self, time, draw, priority):
+        self.time = time
+        self.draw = draw
+        self.add = 0
+        self.high = draw
+        self.low = draw
+        self.priority = priority
+        self.left = None
+        self.right = None
+
+
+class PowerTimeline:
+    """
+    # Global power draw as a step function that the tasks can be added to in any order, for the schedulers
+    that do not place the tasks by increasing start (CPM, HEFT) and so can't check the cap on the running draw
+    # The steps are kept in a treap ordered by time where every node knows the highest and lowest draw of its
+    subtree and the draw added to all of it, so adding a task and finding the earliest window under the cap
+    both take O(log n) descents instead of scanning the steps
+    """
+
+    def __init__(self, static_draw, seed=0):
+        self.random = Random(seed)  # Priorities of the treap, they only change its shape
+        self.static_draw = static_draw  # Draw after the last task
+        self.root = Step(float('-inf'), static_draw, self.random.random())
+
+    @staticmethod
+    def __push(node):
+        add = node.add
+        if add:
+            node.draw += add
+            node.add = 0
+            child = node.left
+            if child is not None:
+                child.add += add
+                child.high += add
+                child.low += add
+            child = node.right
+            if child is not None:
+                child.add += add
+                child.high += add
+                child.low += add
+
+    @staticmethod
+    def __update(node):
+        high = low = node.draw
+        child = node.left
+        if child is not None:
+            if child.high > high:
+                high = child.high
+            if child.low < low:
+                low = child.low
+        child = node.right
+        if child is not None:
+            if child.high > high:
+                high = child.high
+            if child.low < low:
+                low = child.low
+        node.high = high + node.add
+        node.low = low + node.add
+
+    def __split(self, node, key):
+        """
+        :return: (steps starting before key, steps starting at or after key)
+        """
+        if node is None:
+            return None, None
+        self.__push(node)
+        if node.time < key:
+            node.right, right = self.__split(node.right, key)
+            self.__update(node)
+            return node, right
+        left, node.left = self.__split(node.left, key)
+        self.__update(node)
+        return left, node
+
+    def __insert(self, time, draw):
+        """
+        # New step starting at time, at its place by priority, the subtree there is split around it
+        """
+        step = Step(time, draw, self.random.random())
+        parent, node, path = None, self.root, []
+        while node is not None and node.priority > step.priority:
+            self.__push(node)
+            path.append(node)
+            parent, node = node, node.right if node.time < time else node.left
+        step.left, step.right = self.__split(node, time)
+        self.__update(step)
+        if parent is None:
+            self.root = step
+        elif parent.time < time:
+            parent.right = step
+        else:
+            parent.left = step
+        for node in reversed(path):
+            self.__update(node)
+
+    @staticmethod
+    def __tag(node, power):
+        if node is not None:
+            node.add += power
+            node.high += power
+            node.low += power
+
+    def __range_add(self, start, end, power):
+        """
+        # Add power to the steps starting in [start, end), both must start a step; the pending adds commute so
+        nothing is pushed, the subtrees hanging inside the range are tagged along the two boundary paths
+        """
+        node, path = self.root, []
+        while not start <= node.time < end:
+            path.append(node)
+            node = node.right if node.time < start else node.left
+        node.draw += power
+        path.append(node)
+        bottom = []
+        child = node.left  # Starts from start up to node
+        while child is not None:
+            bottom.append(child)
+            if child.time >= start:
+                child.draw += power
+                self.__tag(child.right, power)
+                child = child.left
+            else:
+                child = child.right
+        for child in reversed(bottom):
+            self.__update(child)
+        bottom = []
+        child = node.right  # Starts after node up to end
+        while child is not None:
+            bottom.append(child)
+            if child.time < end:
+                child.draw += power
+                self.__tag(child.left, power)
+                child = child.right
+            else:
+                child = child.left
+        for child in reversed(bottom):
+            self.__update(child)
+        for node in reversed(path):
+            self.__update(node)
+
+    def __step_at(self, time):
+        """
+        :return: (start, draw) of the step holding time
+        """
+        node, step, added = self.root, None, 0
+        while node is not None:
+            added += node.add
+            if node.time <= time:
+                step, node = (node.time, node.draw + added), node.right
+            else:
+                node = node.left
+        return step
+
+    def __first(self, node, key, limit, above, added=0):
+        """
+        # Time of the first step starting at or after key whose draw is over limit (above) or at most limit,
+        the subtrees without one are skipped
+        """
+        if node is None or (node.high + added <= limit if above else node.low + added > limit):
+            return None
+        added += node.add
+        if node.time >= key:
+            time = self.__first(node.left, key, limit, above, added)
+            if time is not None:
+                return time
+            if (node.draw + added > limit) == above:
+                return node.time
+        return self.__first(node.right, key, limit, above, added)
+
+    def add(self, start, end, power):
+        """
+        # Draw power over [start, end)
+        """
+        if start >= end:
+            return
+        for time in (start, end):  # A step has to start at both ends
+            step = self.__step_at(time)
+            if step[0] != time:
+                self.__insert(time, step[1])
+        self.__range_add(start, end, power)
+
+    def earliest_start(self, start, duration, power, cap):
+        """
+        # Earliest time at or after start where power can be drawn for duration without the draw exceeding cap:
+        the first step over the limit in the window moves the start to the next step under it
+        :return: The start or None when even the static draw takes it over cap
+        """
+        limit = cap - power
+        if self.static_draw > limit:
+            return None
+        if self.root.high <= limit:
+            return start
+        while True:
+            over = self.__first(self.root, self.__step_at(start)[0], limit, True)
+            if over is None or over >= start + duration and over > start:
+                return start
+            start = self.__first(self.root, over, limit, False)
+
+
+# Admission of a placement
+ADMIT, WAIT, REJECT = range(3)
+
+
+class Snapshot:
+    """
+    # State of a scheduler at one time, taken by EventDrivenScheduling.snapshot and restored by
+    EventDrivenScheduling.restore
+    # The task columns are shared with the scheduler and copied on write, the append only lists are kept
+    as (list, length) and the other containers as shallow copies
+    """
+
+    def __init__(self, time):
+        self.time = time
+        self.stores = []  # (TaskStore, frozen rows)
+        self.servers = []  # (available_after, available, current_task) of every server
+        self.extra = None  # State of the subclass
 
 
 class Scheduling:
@@ -138,9 +1060,17 @@ class Scheduling:
     :argument tasks -> List of tasks to schedule
               Servers -> List of servers
               Power_cap -> global power capacity for the system
+              log -> EventLog receiving the decisions and warnings, printed to stdout by default
+              stats -> Instrumentation collecting the per-phase timers and counters, disabled by default
+              energy_cap -> total energy allowed, the tasks that would exceed it are rejected
+              enforce_power_cap -> keep the tasks waiting while their power would exceed power_cap,
+              instead of only warning once it is exceeded
     """
 
-    def __init__(self, tasks, servers, power_cap, frequency):
+    ready_queue = True  # The scheduler takes the unblocked tasks from the ready queue of the DependencyTracker
+
+    def __init__(self, tasks, servers, power_cap, frequency, log=None, stats=None, energy_cap=None,
+                 enforce_power_cap=False):
         self.tasks = tasks  # List of tasks
         self.task_dict = {t.tid: t for t in tasks}
         self.servers = servers
@@ -148,130 +1078,641 @@ class Scheduling:
         self.frequency = frequency - 1  # Selected frequency from 1 to 3
         self.current_time = 0
         self.energy = 0
+        self.missed_deadlines = 0
         self.output = []
-        self.__set_critical_time(tasks[0])
+        self.releases = dict()  # tid -> [template, instances released, instances to release] of a periodic task
+        self.hyperperiod = None  # Only the instances of the first hyperperiod are released when set
+        self.periodic_stats = dict()  # tid -> [instances, energy, missed deadlines] in hyperperiod mode
+        self.events = None  # EventQueue when running in event driven mode
+        self.log = log if log is not None else EventLog()
+        self.stats = stats if stats is not None else Instrumentation(enabled=False)
+        self.energy_cap = energy_cap
+        self.enforce_power_cap = enforce_power_cap
+        self.rejected = []  # tid of the tasks rejected by the admission, since the last handover in online mode
+        self.static_draw = sum(server.static_power for server in servers)
+        self.power_draw = self.static_draw  # Current global power draw, updated when tasks start or finish
+        self.power_times = [0]  # Power timeline: time of each change of the draw
+        self.power_changes = [0]
+        # Online mode: the changes before power_start are folded into the peak and the energy up to power_start
+        self.power_start = 0
+        self.power_peak = float('-inf')
+        self.power_energy = 0.0
+        self.online = False  # Completed tasks are evicted and the decisions handed over in online mode
+        self.handed_over = 0  # Decisions of self.output already returned by run_until
+        self.offline = set()  # server_id of the servers taken offline
+        self.largest_headroom = self.__largest_headroom()  # Power of the largest task a server can ever take
+        self.dependencies = DependencyTracker(tasks, self.ready_queue)
+        self.pool = ServerPool(servers)
+        self.__set_critical_time()
+
+    def __largest_headroom(self):
+        return max((server.local_power_cap - server.static_power for server in self.servers
+                    if server.server_id not in self.offline), default=float('-inf'))
 
     def get_available_server(self, task):
-        for server in self.servers:
-            if server.available and (task.power + server.static_power) <= server.local_power_cap:
-                return server
-        return None
+        if not self.stats.enabled:
+            return self.pool.first_fit(task.power)
+        start = perf_counter()
+        server = self.pool.first_fit(task.power)
+        self.stats.stop('server_selection', start)
+        if server is None:
+            self.stats.count('server_selection_failures')
+        return server
 
-    def __set_critical_time(self, task):
-        if not task.successor:
-            task.critical_time = task.unit_of_work
-            return task.unit_of_work
-        else:
-            task.critical_time = task.unit_of_work + max(
-                self.__set_critical_time(self.task_dict[t]) for t in task.successor)
-            return task.critical_time
+    def __set_critical_time(self):
+        """
+        # Longest path from every task to the end of its DAG, computed in reverse topological order
+        # A task is visited once all its successors are done, O(V+E) over every component
+        """
+        pending = {task.tid: len(task.successor) for task in self.tasks}  # successors not visited yet
+        longest = dict.fromkeys(pending, 0)  # longest critical time among the visited successors
+        stack = [task for task in self.tasks if not task.successor]
+        while stack:
+            task = stack.pop()
+            task.critical_time = task.unit_of_work + longest[task.tid]
+            for task_id in task.predecessor:
+                longest[task_id] = max(longest[task_id], task.critical_time)
+                pending[task_id] -= 1
+                if pending[task_id] == 0:
+                    stack.append(self.task_dict[task_id])
 
     def update_servers(self):
+        if self.stats.enabled:
+            start = perf_counter()
+            self.__update_servers()
+            self.stats.stop('server_update', start)
+            self.stats.count('servers_scanned', len(self.servers))
+        else:
+            self.__update_servers()
+
+    def __update_servers(self):
         for server in self.servers:
             if not server.available and server.available_after > 1:
-                server.available_after -= server.performance
+                server.available_after -= 1
+                self.pool.update(server)
             else:
-                server.available_after = 0
-                server.available = True
+                self.release_server(server)
+
+    def release_server(self, server):
+        """
+        # Free the server and release the successors of its finished task
+        :return: List of successor tasks that have no remaining predecessor
+        """
+        if not server.available or server.available_after:
+            server.available_after = 0
+            server.available = True
+            self.pool.update(server)
+        if self.offline and server.server_id in self.offline:
+            self.__park(server)
+        released = []
+        task = server.current_task
+        if task is not None:
+            self.power_draw -= task.power  # The drop was put on the timeline at the end of the row
+            task.running = False
+            released = self.dependencies.complete(task)
+            server.current_task = None
+            if self.online and (task.period == 0 or task.repeat == 0):
+                self.__evict(task.tid)
+                self.dependencies.forget(task.tid)
+        return released
+
+    def __evict(self, task_id):
+        """
+        # Drop a task whose last instance completed or that was rejected, in online mode
+        """
+        self.task_dict.pop(task_id, None)
+        self.releases.pop(task_id, None)
 
-                if server.current_task is not None:
-                    server.current_task.running = False
-                    tmp = server.current_task.successor
-                    for task_id in tmp:
-                        self.task_dict[task_id].predecessor.remove(server.current_task.tid)
-                    server.current_task = None
+    def take_decisions(self):
+        """
+        # Hand over the decisions made since the last call, they are not kept in self.output in online mode
+        # In online mode the rejected tasks are dropped too, along with the cancelled tasks no longer queued, and the
+        power timeline is folded up to the current time
+        """
+        if self.online:
+            decisions, self.output = self.output, []
+            self.rejected = []
+            if self.dependencies.cancelled:
+                queued = [entry[2] for entry in self.dependencies.ready]
+                if self.events is not None:
+                    queued += [entry[2] for entry in self.events.arrivals]
+                self.dependencies.expire(task.tid for task in queued)
+            self.__fold_power(self.current_time)
+        else:
+            decisions = self.output[self.handed_over:]
+            self.handed_over = len(self.output)
+        self.log.flush()
+        return decisions
+
+    def take_offline(self, server_id):
+        """
+        # What-if change: the server takes no new task, the task it runs completes
+        """
+        self.offline.add(server_id)
+        self.largest_headroom = self.__largest_headroom()
+        for server in self.servers:
+            if server.server_id == server_id and server.current_task is None:
+                self.__park(server)
+
+    def __park(self, server):
+        server.available = False
+        server.available_after = float('inf')
+        self.pool.update(server)
+
+    def get_release_time(self, server):
+        """
+        # Time step at which update_servers frees a server that just got a task, the first one at or after the
+        end of its row: available_after (the time left) is decreased by 1 once per time step until it drops to 1
+        """
+        return self.current_time + max(1, ceil(server.available_after))
+
+    def advance_to(self, time):
+        """
+        # Event driven replacement of the time step loop: jump to time and release every
+        server whose task completes on the way
+        :return: List of tasks whose last predecessor completed
+        """
+        start = perf_counter() if self.stats.enabled else None
+        released = []
+        completions = self.events.pop_completions(time)
+        for completion_time, server in completions:
+            self.current_time = completion_time  # The power draw drops at the completion time
+            released += self.release_server(server)
+        self.current_time = time
+        if start is not None:
+            self.stats.stop('server_update', start)
+            self.stats.count('servers_scanned', len(completions))
+        return released
+
+    def set_hyperperiod(self):
+        """
+        # Hyperperiod mode: the periodic tasks only release the instances of one hyperperiod
+        (least common multiple of the periods), the statistics of the other instances are extrapolated
+        # Only WaveFront supports it: FIFO releases the next copy one period after the previous one started,
+        so its copies drift and one hyperperiod is not representative of the others
+        """
+        periods = [task.period for task in self.tasks if task.period > 0 and task.repeat > 0]
+        self.hyperperiod = lcm(*periods) if periods else None
+
+    def release_instance(self, task):
+        """
+        # Next instance of a periodic task that was just assigned
+        :return: Task or None once every instance of the task was released
+        """
+        start = perf_counter() if self.stats.enabled else None
+        release = self.releases.get(task.tid)
+        if release is None:
+            count = task.repeat
+            if self.hyperperiod is not None:
+                count = min(task.repeat, self.hyperperiod // task.period - 1)
+            release = self.releases[task.tid] = [task, 0, count]
+        instance = None
+        if release[1] < release[2]:
+            release[1] += 1
+            instance = release[0].instance(release[1])
+        if start is not None:
+            self.stats.stop('periodic_release', start)
+        return instance
+
+    def extrapolate_hyperperiod(self):
+        """
+        # Scale the statistics of the periodic instances simulated over one hyperperiod to all the instances
+        :return: (energy, expected missed deadlines)
+        """
+        energy, missed = self.energy, self.missed_deadlines
+        for tid, (instances, instances_energy, instances_missed) in self.periodic_stats.items():
+            scale = (self.task_dict[tid].repeat + 1) / instances - 1
+            energy += instances_energy * scale
+            missed += instances_missed * scale
+        return energy, missed
+
+    def print_hyperperiod_report(self):
+        energy, missed = self.extrapolate_hyperperiod()
+        print("Extrapolated from one hyperperiod of", self.hyperperiod, "time steps, total energy:", energy,
+              "Watt, missed deadlines:", missed)
+
+    def record_power(self, time, change):
+        self.power_draw += change
+        self.power_times.append(time)
+        self.power_changes.append(change)
+
+    def power_profile(self):
+        """
+        # Global power draw as a step function, built from the recorded changes in one vectorized pass
+        # In online mode it starts at power_start, the draw before it is folded by take_decisions
+        :return: (times, draw) arrays, draw[i] holds from times[i] to times[i + 1]
+        """
+        times = np.asarray(self.power_times, dtype=float)
+        order = np.argsort(times, kind='stable')
+        times = times[order]
+        draw = self.static_draw + np.cumsum(np.asarray(self.power_changes, dtype=float)[order])
+        last = np.append(times[1:] != times[:-1], True)  # Keep the draw after the last change of each time
+        return times[last], draw[last]
+
+    def __fold_power(self, time):
+        """
+        # Replace the changes of the draw before time by one change to the draw at time, their peak and energy
+        are kept in power_peak and power_energy, so the timeline only holds the changes since the last handover
+        """
+        times, draw = self.power_profile()
+        k = np.searchsorted(times, time)  # Steps starting before time
+        if not k:
+            return
+        self.power_peak = max(self.power_peak, float(draw[:k].max()))
+        self.power_energy += float(np.dot(draw[:k], np.diff(np.append(times[:k], time))))
+        kept = [(t, change) for t, change in zip(self.power_times, self.power_changes) if t >= time]
+        self.power_times = [time] + [t for t, change in kept]  # New lists, the snapshots keep the old ones
+        self.power_changes = [float(draw[k - 1]) - self.static_draw] + [change for t, change in kept]
+        self.power_start = time
+
+    def peak_power(self):
+        return max(self.power_peak, self.power_profile()[1].max())
+
+    def integrated_energy(self, end=None):
+        """
+        # Integral of the global power draw from 0 to end, the makespan by default, end has to be after
+        power_start in online mode
+        """
+        times, draw = self.power_profile()
+        end = self.makespan() if end is None else end
+        durations = np.diff(np.minimum(np.append(times, end), end))
+        return self.power_energy + float(np.dot(draw, durations))
+
+    def task_energy(self, server, task):
+        return server.static_power + (task.power / 20) * server.frequency[self.frequency] ** 3
+
+    def exceeds_energy_cap(self, server, task, energy=None):
+        if self.energy_cap is None:
+            return False
+        return self.energy + (self.task_energy(server, task) if energy is None else energy) > self.energy_cap
+
+    def admit(self, task, server):
+        """
+        # O(1) admission of a placement against the local power caps, the energy cap and, when enforced, the global
+        power cap
+        # Rejected tasks are recorded in self.rejected
+        :argument server -> free server found for the task, None when none fits it now
+        :return: ADMIT, WAIT (until running tasks finish) or REJECT (the task can never be placed)
+        """
+        if task.power > self.largest_headroom or (server is not None and self.exceeds_energy_cap(server, task)) or \
+                (self.enforce_power_cap and self.static_draw + task.power > self.power_cap):
+            self.reject(task, self.current_time)
+            return REJECT
+        if server is None or self.enforce_power_cap and self.power_draw + task.power > self.power_cap:
+            return WAIT
+        return ADMIT
+
+    def reject(self, task, time):
+        """
+        # Drop a task that can't be admitted along with the tasks depending on it
+        """
+        rejected = [task.tid] + self.dependencies.cancel(task)
+        self.rejected += rejected
+        if self.log.rejections:
+            for task_id in rejected:
+                self.log.record(REJECTION, time, task_id)
+        if self.online:
+            for task_id in rejected:
+                self.__evict(task_id)
 
     def __check_missed_deadline(self, task, server_perf):
         if (self.current_time + (task.unit_of_work / server_perf)) > task.deadline:
-            print("!!! Task", task.tid, "has missed its deadline by",
-                  (self.current_time + task.unit_of_work / server_perf) - (task.deadline + task.arrival_date), "!!!")
+            if self.log.deadline_misses:
+                self.log.record(DEADLINE_MISS, self.current_time, task.tid, value=(
+                    self.current_time + task.unit_of_work / server_perf) - (task.deadline + task.arrival_date))
+            return True
+        return False
 
     def assign_task2server(self, server, task):
         self.output.append([task.tid, server.server_id, self.current_time,
                             self.current_time + task.unit_of_work / server.performance])
-        print("Task", task.tid, "assigned to server", server.server_id, "start at:", self.current_time,
-              "end at:",
-              self.current_time + task.unit_of_work / server.performance)
-        self.__check_missed_deadline(task, server.performance)
+        if self.log.assignments:
+            self.log.record(ASSIGNMENT, self.current_time, task.tid, server.server_id,
+                            self.current_time + task.unit_of_work / server.performance)
+        missed = self.__check_missed_deadline(task, server.performance)
         task.running = True
         task.server_id = server.server_id
         server.available = False
         server.available_after = task.unit_of_work / server.performance
         server.current_task = task
-        self.energy += server.static_power + (task.power / 20) * server.frequency[self.frequency] ** 3
+        self.pool.update(server)
+        self.record_power(self.current_time, task.power)
+        # The draw counter only drops when the server is released, the timeline follows the row
+        self.power_times.append(self.current_time + server.available_after)
+        self.power_changes.append(-task.power)
+        energy = self.task_energy(server, task)
+        self.energy += energy
+        self.missed_deadlines += missed
+        if self.hyperperiod is not None and task.period > 0:
+            stats = self.periodic_stats.setdefault(task.tid, [0, 0, 0])
+            stats[0] += 1
+            stats[1] += energy
+            stats[2] += missed
+        if self.events is not None:
+            self.events.push_completion(self.get_release_time(server), server)
+
+    def makespan(self):
+        return max((line[3] for line in self.output), default=0)
+
+    def render(self, plot_file=None):
+        """
+        # Gantt chart of self.output, written to plot_file or shown in a window (blocking) when not given
+        """
+        plot(input_data=self.output, label=self.__class__.__name__ + " scheduling on multiple servers",
+             output_file=plot_file)
 
     def write_results(self):
+        start = perf_counter() if self.stats.enabled else None
         tmp = "results.txt".split('.')
-        file1 = open(tmp[0] + "_" + self.__class__.__name__ + "." + tmp[1], "w")  # write mode
-        file1.write("#jobid server_id start end \n")
-        for line in self.output:
-            file1.write(" ".join(str(e) for e in line) + "\n")
-        file1.close()
+        with open(tmp[0] + "_" + self.__class__.__name__ + "." + tmp[1], "w") as file1:  # write mode
+            file1.write("#jobid server_id start end \n" +
+                        "".join("%s %s %s %s\n" % tuple(line) for line in self.output))
+        if start is not None:
+            self.stats.stop('output_writing', start)
+
+
+class EventDrivenScheduling(Scheduling):
+    """
+    # Super class of the schedulers that place the tasks in time order and can stop at any time (WaveFront, FIFO)
+    # Online mode: tasks are added with submit() while the scheduler runs, run_until() returns the decisions
+    up to a time and decisions()/adecisions() stream them from an iterable or an asyncio queue of tasks
+    # What-if: snapshot() the state at a time, then reschedule() from it with a change applied
+    """
+
+    def submit(self, task):
+        """
+        # Online mode: add a task arriving while the scheduler runs, tasks have to be submitted after their
+        predecessors, see new_task, and before the handover of their rejected predecessors
+        :return: False when the task is rejected as one of its predecessors was
+        """
+        self.online = True
+        if task.tid in self.dependencies.cancelled:
+            return False
+        if any(task_id in self.dependencies.cancelled for task_id in task.predecessor):
+            self.reject(task, self.current_time)
+            return False
+        self.task_dict[task.tid] = task
+        self.dependencies.submit(task)
+        return True
+
+    def run_until(self, time):
+        """
+        # Online mode: make every decision up to time, implemented by the subclasses
+        :return: List of the new decisions [tid, server_id, start, end]
+        """
+        raise NotImplementedError(self.__class__.__name__ + " has no online mode")
 
+    def snapshot(self):
+        """
+        # Compact copy of the scheduling state at the current time, see Snapshot
+        """
+        snapshot = Snapshot(self.current_time)
+        stores = {id(task.store): task.store for task in self.task_dict.values()}
+        stores.update((id(server.current_task.store), server.current_task.store) for server in self.servers
+                      if server.current_task is not None)
+        snapshot.stores = [(store, store.freeze()) for store in stores.values()]
+        snapshot.servers = [(server.available_after, server.available, server.current_task) for server in self.servers]
+        snapshot.pool = (self.pool.headroom[:], self.pool.earliest[:])
+        snapshot.scalars = (self.energy, self.missed_deadlines, self.power_draw, self.hyperperiod, self.online,
+                            self.handed_over, self.power_start, self.power_peak, self.power_energy)
+        snapshot.lists = [(values, len(values)) for values in
+                          (self.output, self.power_times, self.power_changes, self.rejected)]
+        snapshot.task_dict = dict(self.task_dict)
+        snapshot.releases = {task_id: release[:] for task_id, release in self.releases.items()}
+        snapshot.periodic_stats = {task_id: stats[:] for task_id, stats in self.periodic_stats.items()}
+        snapshot.offline = (set(self.offline), self.largest_headroom)
+        snapshot.dependencies = self.dependencies.snapshot()
+        snapshot.events = self.events.snapshot() if self.events is not None else None
+        return snapshot
 
-class WaveFront(Scheduling):
+    def restore(self, snapshot):
+        """
+        # Back to the state of a snapshot, which can be restored again later
+        """
+        self.current_time = snapshot.time
+        for store, state in snapshot.stores:
+            store.thaw(state)
+        for server, (available_after, available, current_task) in zip(self.servers, snapshot.servers):
+            server.available_after = available_after
+            server.available = available
+            server.current_task = current_task
+        self.pool.headroom = snapshot.pool[0][:]
+        self.pool.earliest = snapshot.pool[1][:]
+        self.energy, self.missed_deadlines, self.power_draw, self.hyperperiod, self.online, \
+            self.handed_over, self.power_start, self.power_peak, self.power_energy = snapshot.scalars
+        self.output, self.power_times, self.power_changes, self.rejected = \
+            [values[:length] for values, length in snapshot.lists]
+        self.task_dict = dict(snapshot.task_dict)
+        self.releases = {task_id: release[:] for task_id, release in snapshot.releases.items()}
+        self.periodic_stats = {task_id: stats[:] for task_id, stats in snapshot.periodic_stats.items()}
+        offline, self.largest_headroom = snapshot.offline
+        self.offline = set(offline)
+        self.dependencies.restore(snapshot.dependencies)
+        if snapshot.events is not None:
+            self.events.restore(snapshot.events)
+
+    def reschedule(self, snapshot, change=None, until=float('inf')):
+        """
+        # What-if: restore the snapshot, apply change(self) and schedule from there, so only the decisions
+        after the snapshot are computed again
+        :argument change -> function changing the scheduler, e.g. lambda s: s.take_offline(2)
+        :return: List of the decisions made after the snapshot
+        """
+        self.restore(snapshot)
+        if change is not None:
+            change(self)
+        return self.run_until(until)
+
+    def queued_tasks(self):
+        """
+        # Released tasks waiting to start, in the ready and blocked queues of the dependencies and the arrival queue
+        """
+        queued = [entry[2] for entry in self.dependencies.ready]
+        queued += [task for order, task in self.dependencies.blocked.values()]
+        if self.events is not None:
+            queued += [entry[2] for entry in self.events.arrivals]
+        return queued
+
+    def set_unit_of_work(self, tid, unit_of_work):
+        """
+        # What-if change of the work of a task that did not start yet: its instances already released and waiting
+        and its next periodic instances
+        """
+        self.task_dict[tid].unit_of_work = unit_of_work
+        if tid in self.releases:
+            self.releases[tid][0].unit_of_work = unit_of_work
+        for task in self.queued_tasks():
+            if task.tid == tid:
+                task.unit_of_work = unit_of_work
+
+    def decisions(self, source):
+        """
+        # Online mode: schedule the tasks of source as they come, source yields them in arrival order
+        :return: Generator of the decisions, the decisions before an arrival are made before it is read
+        """
+        for task in source:
+            yield from self.run_until(task.arrival_date - 1)
+            self.submit(task)
+        yield from self.run_until(float('inf'))
+
+    async def adecisions(self, queue):
+        """
+        # Same as decisions, fed by an asyncio.Queue of tasks ended by None
+        """
+        while True:
+            task = await queue.get()
+            if task is None:
+                break
+            for decision in self.run_until(task.arrival_date - 1):
+                yield decision
+            self.submit(task)
+        for decision in self.run_until(float('inf')):
+            yield decision
+
+
+class WaveFront(EventDrivenScheduling):
     """
-    # Class WaveFront that extends the super class Scheduling
+    # Class WaveFront that extends the super class EventDrivenScheduling
     # Implements the WaveFront algorithm
     # Write the output schedule to txt file "results_WaveFront.txt"
     # display the results using the provided plotter
     """
 
     def __get_ready_tasks(self, previous_ready_tasks):
-        for t in self.tasks:
-            if t not in previous_ready_tasks and not t.predecessor \
-                    and t.arrival_date <= self.current_time and t.server_id is None:
-                previous_ready_tasks.append(t)
+        if self.stats.enabled:
+            start = perf_counter()
+            previous_ready_tasks += self.dependencies.pop_ready(self.current_time)
+            self.stats.stop('ready_set', start)
+            self.stats.peak('ready_set', len(previous_ready_tasks))
+        else:
+            previous_ready_tasks += self.dependencies.pop_ready(self.current_time)
+        if self.log.ready_sets:
+            self.log.record(READY_SET, self.current_time, value=len(previous_ready_tasks))
         return previous_ready_tasks
 
-    def __check_global_power(self):
-        current_draw = 0
-        for server in self.servers:
-            current_draw += server.static_power
-            if server.current_task is not None:
-                current_draw += server.current_task.power
-        return current_draw <= self.power_cap
-
-    def __check_missed_deadline(self, task, server_perf):
-        if (self.current_time + (task.unit_of_work / server_perf)) > task.deadline:
-            print("!!! Task", task.tid, "has missed its deadline by",
-                  (self.current_time + task.unit_of_work / server_perf) - (task.deadline + task.arrival_date), "!!!")
-
-    def build_wavefront_table(self, max_time):
-        print("#" * 60)
-        print("WaveFront scheduling")
+    def __assign_ready_tasks(self, ready_tasks):
         treated_tasks = []
+        for task in ready_tasks:
+            if self.pool.headroom[1] == float('-inf') and not self.log.no_server:
+                break  # Every server is busy, the other tasks wait without being recorded
+            server = super().get_available_server(task)
+            admission = super().admit(task, server)
+            if admission == ADMIT:
+                super().assign_task2server(server, task)
+                treated_tasks.append(task)
+                task_repeat = super().release_instance(task) if task.repeat > 0 else None
+                if task_repeat is not None:
+                    self.dependencies.add(task_repeat)
+                    # print("task", task_repeat.tid, "will come back at", task_repeat.arrival_date)
+            elif admission == REJECT:
+                treated_tasks.append(task)
+            elif server is None and self.log.no_server:
+                self.log.record(NO_SERVER, self.current_time, task.tid)
+        if self.log.power_warnings and self.power_draw > self.power_cap:
+            self.log.record(POWER_WARNING, self.current_time, value=self.power_draw)
+        return treated_tasks
+
+    def __run_time_steps(self, max_time):
         ready_tasks = self.__get_ready_tasks([])
         while self.current_time < max_time:
             # print("##### ready tasks at time:", current_time, self.test(ready_tasks), "######")
-            for task in ready_tasks:
-                server = super().get_available_server(task)
-                if server is not None:
-                    super().assign_task2server(server, task)
-                    treated_tasks.append(task)
-                    if task.repeat > 0:
-                        task_repeat = deepcopy(task)
-                        task_repeat.repeat -= 1
-                        task_repeat.arrival_date += task_repeat.period
-                        task_repeat.deadline += task_repeat.period
-                        task_repeat.server_id = None
-                        self.tasks.append(task_repeat)
-                        self.tasks.remove(task)
-                        # print("task", task_repeat.tid, "will come back at", task_repeat.arrival_date)
-                else:
-                    print("No available servers for task:", task.tid, "at time:", self.current_time)
-            if not self.__check_global_power():
-                print(" !!! WARNING !!! : Power exceeded system capacity")
+            treated_tasks = self.__assign_ready_tasks(ready_tasks)
+            if self.stats.enabled:
+                self.__count_tick(treated_tasks)
             self.current_time += 1
             super().update_servers()
             # update ready_tasks list:
             for t in treated_tasks:
                 ready_tasks.remove(t)
-            treated_tasks = []
             ready_tasks = self.__get_ready_tasks(ready_tasks)
+
+    def __start_events(self):
+        self.events = EventQueue()
+        self.__ready_tasks = []
+        self.__time = 0  # Next time step to process
+
+    def __process_events(self, until):
+        """
+        # Assign the ready tasks at every event time before until
+        """
+        ready_tasks = self.__ready_tasks
+        time = self.__time
+        while time < until:
+            super().advance_to(time)
+            ready_tasks = self.__get_ready_tasks(ready_tasks)
+            treated_tasks = self.__assign_ready_tasks(ready_tasks)
+            if self.stats.enabled:
+                self.__count_tick(treated_tasks)
+            for t in treated_tasks:
+                ready_tasks.remove(t)
+            next_times = [nt for nt in (self.events.next_time(), self.dependencies.next_arrival()) if nt is not None]
+            if treated_tasks and ready_tasks and self.energy_cap is not None:
+                # The first fitting server of the waiting tasks changed, their energy is checked at the next step
+                next_times.append(time + 1)
+            if not next_times:  # Nothing happens before the next submission
+                time += 1
+                break
+            time = min(max(time + 1, min(next_times)), until)
+        self.__ready_tasks = ready_tasks
+        self.__time = time
+
+    def __run_events(self, max_time):
+        self.__start_events()
+        self.__process_events(max_time)
+        super().advance_to(max_time)
+        self.__ready_tasks = self.__get_ready_tasks(self.__ready_tasks)
+
+    def run_until(self, time):
+        if self.events is None:
+            self.__start_events()
+        self.__process_events(time + 1)
+        return super().take_decisions()
+
+    def snapshot(self):
+        if self.events is None:
+            self.__start_events()
+        snapshot = super().snapshot()
+        snapshot.extra = (self.__ready_tasks[:], self.__time)
+        return snapshot
+
+    def queued_tasks(self):
+        return super().queued_tasks() + (self.__ready_tasks if self.events is not None else [])
+
+    def restore(self, snapshot):
+        super().restore(snapshot)
+        ready_tasks, self.__time = snapshot.extra
+        self.__ready_tasks = ready_tasks[:]
+
+    def __count_tick(self, treated_tasks):
+        self.stats.count('ticks')
+        if not treated_tasks:
+            self.stats.count('idle_ticks')
+
+    def schedule(self, max_time, event_driven=True, hyperperiod=False):
+        """
+        # Build the WaveFront schedule up to max_time into self.output, without writing or plotting it
+        :argument event_driven -> jump from event to event instead of iterating over every time step
+                  hyperperiod -> simulate one hyperperiod of the periodic tasks and extrapolate the statistics
+        """
+        if hyperperiod:
+            super().set_hyperperiod()
+        if event_driven:
+            self.__run_events(max_time)
+        else:
+            self.__run_time_steps(max_time)
+        self.log.flush()
+
+    def build_wavefront_table(self, max_time, event_driven=True, hyperperiod=False, plot_file=None):
+        print("#" * 60)
+        print("WaveFront scheduling")
+        self.stats.call(self.schedule, max_time, event_driven, hyperperiod)
         print("Total energy:", self.energy, "Watt")
+        if self.rejected:
+            print("Rejected tasks:", self.rejected)
+        if hyperperiod:
+            super().print_hyperperiod_report()
         self.write_results()
-        plot(input_data=self.output, label="WaveFront scheduling on multiple servers")
+        self.render(plot_file)
 
     def get_available_tasks_fifo(self, current_time):
         tmp = []
@@ -281,29 +1722,32 @@ class WaveFront(Scheduling):
         return tmp
 
 
-class FIFO(Scheduling):
+class FIFO(EventDrivenScheduling):
     """
-    # Class FIFO that extends the super class Scheduling
+    # Class FIFO that extends the super class EventDrivenScheduling
     # Implements the FIFO algorithm
     # Write the output schedule to txt file "results_FIFO.txt"
     # display the results using the provided plotter
     """
+    ready_queue = False  # FIFO keeps its own arrival queue
+    __recorded = None  # Last time the queue was recorded
 
     def __sort_fifo(self):
         self.tasks.sort(key=lambda t: t.arrival_date, reverse=False)
 
-    def __get_ready_tasks(self):
-        tmp = []
-        print("Getting ready tasks for time:", self.current_time)
-        for task in self.tasks:
-            if task.server_id is None and task.arrival_date <= self.current_time and not task.predecessor:
-                tmp.append(task)
-        return tmp
+    def __record_queue(self, arrival_dates):
+        """
+        # Record the number of queued tasks that arrived, the ready set of FIFO, once per time step
+        """
+        if self.__recorded != self.current_time:
+            self.__recorded = self.current_time
+            self.log.record(READY_SET, self.current_time,
+                            value=sum(1 for arrival_date in arrival_dates if arrival_date <= self.current_time))
 
     def __insert_in_sorted_fifo(self, t):
         insert_position = len(self.tasks) - 1
         count = 0
-        while self.tasks[insert_position].arrival_date > t.arrival_date:
+        while insert_position >= 0 and self.tasks[insert_position].arrival_date > t.arrival_date:
             insert_position -= 1
             count += 1
         if count > 0:
@@ -311,41 +1755,143 @@ class FIFO(Scheduling):
         else:
             self.tasks.append(t)
 
-    def build_fifo_table(self):
-        print("#" * 60)
-        print("FIFO scheduling")
-        self.__sort_fifo()
+    def __repeat_task(self, task):
+        """
+        # Next instance of a periodic task, FIFO releases it one period after the start of the previous one
+        """
+        task_repeat = super().release_instance(task)
+        if task_repeat is not None:
+            task_repeat.arrival_date = self.current_time + task_repeat.period
+            task_repeat.deadline = task.deadline + task_repeat.arrival_date
+        return task_repeat
 
+    def __run_time_steps(self):
         while self.tasks:
 
             while self.tasks[0].arrival_date > self.current_time:
                 self.current_time += 1
                 super().update_servers()
 
+            if self.log.ready_sets:
+                self.__record_queue(task.arrival_date for task in self.tasks)
             task = self.tasks.pop(0)
-            if not task.predecessor:
+            if task.tid in self.dependencies.cancelled:
+                continue
+            if not self.dependencies.is_blocked(task):
                 # print("Time:", self.current_time, "Current task:", task.tid)
                 server = super().get_available_server(task)
-                if server is not None:
+                admission = super().admit(task, server)
+                if admission == ADMIT:
                     super().assign_task2server(server, task)
-                    if task.repeat > 0:
-                        task_repeat = deepcopy(task)
-                        task_repeat.repeat -= 1
-                        task_repeat.arrival_date = self.current_time + task_repeat.period
-                        task_repeat.deadline += task_repeat.arrival_date
-                        task_repeat.server_id = None
+                    task_repeat = self.__repeat_task(task) if task.repeat > 0 else None
+                    if task_repeat is not None:
                         self.__insert_in_sorted_fifo(task_repeat)
-                else:
+                elif admission == WAIT:
                     self.tasks.insert(0, task)
                     self.current_time += 1
                     super().update_servers()
             else:
+                if self.stats.enabled:
+                    self.stats.count('blocked_head')
                 self.tasks.insert(0, task)
                 self.current_time += 1
                 super().update_servers()
+
+    def __start_events(self):
+        # The arrival heap is ordered by (arrival_date, insertion order) like the sorted fifo list
+        self.events = EventQueue()
+        for task in self.tasks:
+            self.events.push_arrival(task)
+
+    def __process_events(self, until):
+        """
+        # Assign the heads of the queue arriving before until
+        :return: Head of the queue when it can't be scheduled as no running task is left to release it
+        """
+        while self.events.arrivals:
+            task = self.events.peek_arrival()
+            if task.arrival_date >= until:
+                break
+            if task.arrival_date > self.current_time:
+                super().advance_to(task.arrival_date)
+            if self.log.ready_sets:
+                self.__record_queue(entry[0] for entry in self.events.arrivals)
+            order, task = self.events.pop_arrival()
+            if task.tid in self.dependencies.cancelled:
+                continue
+            if self.dependencies.is_blocked(task):
+                server = None
+                if self.stats.enabled:
+                    self.stats.count('blocked_head')
+            else:
+                server = super().get_available_server(task)
+            admission = super().admit(task, server)
+            if admission == ADMIT:
+                super().assign_task2server(server, task)
+                task_repeat = self.__repeat_task(task) if task.repeat > 0 else None
+                if task_repeat is not None:
+                    self.events.push_arrival(task_repeat)
+            elif admission == WAIT:
+                # The head of the queue waits until a running task completes
+                self.events.restore_arrival(order, task)
+                next_time = self.events.next_completion()
+                if next_time is None:
+                    return task
+                if next_time >= until:
+                    break
+                super().advance_to(next_time)
+        return None
+
+    def __run_events(self):
+        self.__start_events()
+        task = self.__process_events(float('inf'))
+        if task is not None and self.log.stalls:
+            self.log.record(STALL, self.current_time, task.tid)
+
+    def submit(self, task):
+        if self.events is None:
+            self.__start_events()
+        if super().submit(task):
+            self.events.push_arrival(task)
+            return True
+        return False
+
+    def run_until(self, time):
+        if self.events is None:
+            self.__start_events()
+        self.__process_events(time + 1)
+        if time == float('inf'):  # Release the tasks still running
+            time = max((entry[0] for entry in self.events.completions), default=self.current_time)
+        if time > self.current_time:
+            super().advance_to(time)
+        return super().take_decisions()
+
+    def snapshot(self):
+        if self.events is None:
+            self.__start_events()
+        return super().snapshot()
+
+    def schedule(self, event_driven=True):
+        """
+        # Build the FIFO schedule into self.output until every task is assigned, without writing or plotting it
+        :argument event_driven -> jump from event to event instead of iterating over every time step
+        """
+        self.__sort_fifo()
+        if event_driven:
+            self.__run_events()
+        else:
+            self.__run_time_steps()
+        self.log.flush()
+
+    def build_fifo_table(self, event_driven=True, plot_file=None):
+        print("#" * 60)
+        print("FIFO scheduling")
+        self.stats.call(self.schedule, event_driven)
         print("Total energy:", self.energy, "Watt")
+        if self.rejected:
+            print("Rejected tasks:", self.rejected)
         self.write_results()
-        plot(input_data=self.output, label="FIFO scheduling on multiple servers")
+        self.render(plot_file)
 
 
 class CPM(Scheduling):
@@ -357,69 +1903,313 @@ class CPM(Scheduling):
     """
 
     def __get_critical_paths(self):
-        tmp = deepcopy(self.tasks)
+        """
+        # Split the tasks into critical paths: start from the unassigned task with the highest critical time
+        (max-heap, first task of the list on ties) and follow the unassigned successor with the highest critical
+        time until none is left, so every task belongs to exactly one path
+        """
+        heap = [(-task.critical_time, i, task.tid) for i, task in enumerate(self.tasks)]
+        heapq.heapify(heap)
+        assigned = set()
         paths = []
-        while tmp:
-            mx = 0
-            mx_id = None
-            for task in tmp:
-                if task.critical_time > mx:
-                    mx = task.critical_time
-                    mx_id = task.tid
+        while heap:
+            mx_id = heapq.heappop(heap)[2]
+            if mx_id in assigned:
+                continue
             cp = [mx_id]
-            while self.task_dict[mx_id].successor:
-                tmp_mx_id = 0
-                mx = 0
-                for suc_id in self.task_dict[mx_id].successor:
-                    if mx < self.task_dict[suc_id].critical_time:
-                        mx = self.task_dict[suc_id].critical_time
-                        tmp_mx_id = suc_id
-                cp.append(tmp_mx_id)
-                mx_id = tmp_mx_id
+            assigned.add(mx_id)
+            while True:
+                successors = [t for t in self.task_dict[mx_id].successor if t not in assigned]
+                if not successors:
+                    break
+                mx_id = max(successors, key=lambda t: self.task_dict[t].critical_time)
+                cp.append(mx_id)
+                assigned.add(mx_id)
             paths.append(cp)
-            for tid in cp:
-                for task in tmp:
-                    if task.tid == tid:
-                        tmp.remove(task)
-                        break
-
         return paths
 
     def __find_available_server(self):
-        mini = self.servers[0].available_after
-        srv = self.servers[0]
-        for i in range(1, len(self.servers)):
-            if mini > self.servers[i].available_after:
-                mini = self.servers[i].available_after
-                srv = self.servers[i]
-        return srv
-
-    def build_cpm_table(self):
-        print("#" * 60)
-        print("CPM scheduling")
-        critical_paths = self.__get_critical_paths()
-        print("Critical paths:", critical_paths)
+        if not self.stats.enabled:
+            return self.pool.earliest_available()
+        start = perf_counter()
+        server = self.pool.earliest_available()
+        self.stats.stop('server_selection', start)
+        return server
+
+    def schedule(self):
+        """
+        # Build the CPM schedule into self.output, without writing or plotting it
+        """
+        critical_paths = self.critical_paths = self.__get_critical_paths()
+        release_dates = dict()  # tid -> arrival date delayed by the predecessors already scheduled
+        # The paths are placed one after the other, so the cap is checked against the draw of all the placed tasks
+        timeline = PowerTimeline(self.static_draw) if self.enforce_power_cap else None
         for i in range(len(critical_paths)):
             server = self.__find_available_server()
-            time = max(server.available_after, self.task_dict[critical_paths[i][0]].arrival_date)
+            first_task = self.task_dict[critical_paths[i][0]]
+            time = max(server.available_after, release_dates.get(first_task.tid, first_task.arrival_date))
             for tid in critical_paths[i]:
                 task = self.task_dict[tid]
+                if tid in self.dependencies.cancelled:
+                    continue
+                if timeline is not None:
+                    start = timeline.earliest_start(time, task.unit_of_work / server.performance, task.power,
+                                                    self.power_cap)
+                    if start is None:
+                        super().reject(task, time)
+                        continue
+                    time = start
+                if super().exceeds_energy_cap(server, task):
+                    super().reject(task, time)
+                    continue
+                if timeline is not None:
+                    timeline.add(time, time + task.unit_of_work / server.performance, task.power)
                 self.output.append([task.tid, server.server_id, time,
                                     time + task.unit_of_work / server.performance])
-                print("Task", task.tid, "assigned to server", server.server_id, "start at:", time,
-                      "end at:",
-                      time + task.unit_of_work / server.performance)
+                if self.log.assignments:
+                    self.log.record(ASSIGNMENT, time, task.tid, server.server_id,
+                                    time + task.unit_of_work / server.performance)
+                super().record_power(time, task.power)
                 time += (task.unit_of_work / server.performance)
-                self.energy += server.static_power + (task.power / 20) * server.frequency[self.frequency] ** 3
+                super().record_power(time, -task.power)
+                if time > task.deadline:
+                    self.missed_deadlines += 1
+                self.energy += super().task_energy(server, task)
                 for successor in task.successor:
-                    t = self.task_dict[successor]
-                    t.arrival_date = max(t.arrival_date, time)
+                    release_dates[successor] = max(release_dates.get(successor, self.task_dict[successor].arrival_date),
+                                                   time)
                 server.available_after = time
                 server.available = False
+                self.pool.update(server)
+        self.log.flush()
+
+    def build_cpm_table(self, plot_file=None):
+        print("#" * 60)
+        print("CPM scheduling")
+        self.stats.call(self.schedule)
+        print("Critical paths:", self.critical_paths)
         print("Total energy:", self.energy, "Watt")
+        if self.rejected:
+            print("Rejected tasks:", self.rejected)
         self.write_results()
+        self.render(plot_file)
+
+    def render(self, plot_file=None):
         plot(input_data=self.output,
-             label="CPM scheduling on multiple servers \n Critical paths: " + str(critical_paths))
+             label="CPM scheduling on multiple servers \n Critical paths: " + str(self.critical_paths),
+             output_file=plot_file)
+
+
+class HEFT(Scheduling):
+    """
+    # Class HEFT "Heterogeneous Earliest Finish Time" that extends the super class Scheduling
+    # Implements the HEFT list scheduling: tasks by decreasing upward rank, each one on the server where it
+    finishes first, inserted in an idle gap of the server when one is long enough
+    # Energy aware mode: the frequency level of every placement is chosen too, see __cheapest_placement
+    # Write the output schedule to txt file "results_HEFT.txt"
+    # display the results using the provided plotter
+    """
+
+    def __init__(self, tasks, servers, power_cap, frequency, energy_aware=False, **options):
+        """
+        :argument energy_aware -> choose the server and frequency level of every placement to minimize the
+                                  energy under the deadline, instead of the global frequency
+        """
+        super().__init__(tasks, servers, power_cap, frequency, **options)
+        self.energy_aware = energy_aware
+        self.frequencies = []  # Frequency of each decision of self.output in energy aware mode
+
+    def __find(self, gaps, earliest, duration, draw, timeline):
+        """
+        # Earliest gap of a server, moved on while the global draw would exceed power_cap when a timeline is given
+        :return: (start, gap holding it)
+        """
+        start, gap = gaps.find(earliest, duration)
+        while timeline is not None:
+            earliest = timeline.earliest_start(start, duration, draw, self.power_cap)
+            if earliest == start:
+                break
+            start, gap = gaps.find(earliest, duration)
+        return start, gap
+
+    def __earliest_finish(self, task, ready, servers, timeline=None):
+        """
+        # Server where the task finishes first, the servers are sorted from the fastest so the search stops
+        once a server could not finish earlier even without waiting
+        :argument timeline -> PowerTimeline of the placed tasks when the power cap is enforced
+        :return: (finish, server, start, gaps, gap, energy, power draw, frequency) or None when no server
+                 accepts the power of the task
+        """
+        best = None
+        unit_of_work, power = task.unit_of_work, task.power
+        if timeline is not None:
+            # No server starts before the draw leaves room for the shortest duration, the one of the fastest server
+            ready = timeline.earliest_start(ready, unit_of_work / servers[0][0], power, self.power_cap)
+            if ready is None:
+                return None
+        for performance, headroom, server, gaps in servers:
+            duration = unit_of_work / performance
+            if best is not None and ready + duration >= best[0]:
+                break
+            if power > headroom:
+                continue
+            start, gap = self.__find(gaps, ready, duration, power, timeline)
+            if best is None or start + duration < best[0]:
+                best = (start + duration, server, start, gaps, gap)
+        if best is None:
+            return None
+        return best + (super().task_energy(best[1], task), power, best[1].frequency[self.frequency])
+
+    @staticmethod
+    def __frequency_levels(servers):
+        """
+        # Flat arrays over every (server, frequency level) pair, fastest first
+        # At frequency f the speed of a server is performance * f / f_min and the power draw of a task
+        is its power * (f / f_min) ** 3, f_min being the lowest frequency of the server
+        :return: Dictionary of arrays: entry (position in servers), frequency, speed, draw (scale of the task
+                 power), cube (f ** 3 of the energy), static_power and headroom
+        """
+        levels = {name: [] for name in ('entry', 'frequency', 'speed', 'draw', 'cube', 'static_power', 'headroom')}
+        for i, (performance, headroom, server, gaps) in enumerate(servers):
+            frequencies = server.frequency
+            for f in frequencies:
+                levels['entry'].append(i)
+                levels['frequency'].append(f)
+                levels['speed'].append(performance * f / frequencies[0])
+                levels['draw'].append((f / frequencies[0]) ** 3)
+                levels['cube'].append(f ** 3)
+                levels['static_power'].append(server.static_power)
+                levels['headroom'].append(headroom)
+        levels = {name: np.array(values) for name, values in levels.items()}
+        order = np.argsort(-levels['speed'], kind='stable')
+        return {name: values[order] for name, values in levels.items()}
+
+    def __latest_finish(self, speed):
+        """
+        # Latest finish of every task that still lets its successors meet their deadline at the given speed,
+        computed in reverse topological order like the critical time
+        :return: Dictionary tid -> latest finish
+        """
+        pending = {task.tid: len(task.successor) for task in self.tasks}  # successors not visited yet
+        latest = {task.tid: task.deadline for task in self.tasks}
+        stack = [task for task in self.tasks if not task.successor]
+        while stack:
+            task = stack.pop()
+            for task_id in task.predecessor:
+                latest[task_id] = min(latest[task_id], latest[task.tid] - task.unit_of_work / speed)
+                pending[task_id] -= 1
+                if pending[task_id] == 0:
+                    stack.append(self.task_dict[task_id])
+        return latest
+
+    def __cheapest_placement(self, task, ready, deadline, servers, levels, timeline=None):
+        """
+        # Energy aware placement: the energy, duration, power draw and earliest possible finish of every
+        (server, frequency level) pair are computed at once, then the gaps are searched by increasing
+        energy until a placement finishes by the deadline
+        # When none does, the placement finishing first is taken
+        :return: (finish, server, start, gaps, gap, energy, power draw, frequency) or None when no level of
+                 any server accepts the power draw of the task
+        """
+        duration = task.unit_of_work / levels['speed']
+        energy = levels['static_power'] + (task.power / 20) * levels['cube']
+        draw = task.power * levels['draw']
+        fits = draw <= levels['headroom']
+        if timeline is not None:
+            fits &= self.static_draw + draw <= self.power_cap
+        on_time = np.flatnonzero(fits & (ready + duration <= deadline))
+        candidates = on_time[np.lexsort((duration[on_time], energy[on_time]))].tolist()
+        best = None
+        for k in candidates:
+            finish, placement = self.__place(k, ready, servers, levels, duration, energy, draw, timeline)
+            if finish <= deadline:
+                return placement
+        for k in np.flatnonzero(fits).tolist():  # Fastest first, see __earliest_finish
+            if best is not None and ready + duration.item(k) >= best[0]:
+                break
+            finish, placement = self.__place(k, ready, servers, levels, duration, energy, draw, timeline)
+            if best is None or finish < best[0]:
+                best = placement
+        return best
+
+    def __place(self, k, ready, servers, levels, duration, energy, draw, timeline):
+        """
+        # Earliest gap of the server of the level k
+        :return: (finish, placement tuple of __cheapest_placement)
+        """
+        performance, headroom, server, gaps = servers[levels['entry'].item(k)]
+        start, gap = self.__find(gaps, ready, duration.item(k), draw.item(k), timeline)
+        finish = start + duration.item(k)
+        return finish, (finish, server, start, gaps, gap, energy.item(k), draw.item(k), levels['frequency'].item(k))
+
+    def schedule(self):
+        """
+        # Build the HEFT schedule into self.output, without writing or plotting it
+        # Without communication costs the upward rank of a task is its critical time times the mean
+        1 / performance of the servers, so the ready tasks are taken by decreasing critical time
+        """
+        servers = sorted(((server.performance, server.local_power_cap - server.static_power, server, GapIndex(i))
+                          for i, server in enumerate(self.servers)), key=lambda entry: -entry[0])
+        pending = {task.tid: len(task.predecessor) for task in self.tasks}  # predecessors not placed yet
+        finish = dict()  # tid -> finish time of its first instance
+        heap = [(-task.critical_time, i, task) for i, task in enumerate(self.tasks) if not pending[task.tid]]
+        heapq.heapify(heap)
+        order = count(len(self.tasks))
+        levels = latest = None
+        timeline = PowerTimeline(self.static_draw) if self.enforce_power_cap else None
+        if self.energy_aware:
+            levels = self.__frequency_levels(servers)
+            latest = self.__latest_finish(levels['speed'].max(initial=1))
+        while heap:
+            task = heapq.heappop(heap)[2]
+            if task.tid in self.dependencies.cancelled:
+                continue
+            ready = max([task.arrival_date] + [finish[task_id] for task_id in task.predecessor])
+            if levels is not None:
+                # The first instance has to leave time to the successors of the task
+                deadline = task.deadline if task.tid in finish else min(task.deadline, latest[task.tid])
+                best = self.__cheapest_placement(task, ready, deadline, servers, levels, timeline)
+            else:
+                best = self.__earliest_finish(task, ready, servers, timeline)
+            if best is None or super().exceeds_energy_cap(best[1], task, best[5]):
+                super().reject(task, ready)
+                continue
+            end, server, start, gaps, gap, energy, draw, frequency = best
+            gaps.reserve(gap, start, end)
+            if timeline is not None:
+                timeline.add(start, end, draw)
+            self.output.append([task.tid, server.server_id, start, end])
+            if levels is not None:
+                self.frequencies.append(frequency)
+            if self.log.assignments:
+                self.log.record(ASSIGNMENT, start, task.tid, server.server_id, end)
+            super().record_power(start, draw)
+            super().record_power(end, -draw)
+            if end > task.deadline:
+                self.missed_deadlines += 1
+            self.energy += energy
+            task.server_id = server.server_id
+            if task.tid not in finish:
+                finish[task.tid] = end
+                for task_id in task.successor:
+                    pending[task_id] -= 1
+                    if pending[task_id] == 0:
+                        successor = self.task_dict[task_id]
+                        heapq.heappush(heap, (-successor.critical_time, next(order), successor))
+            task_repeat = super().release_instance(task) if task.repeat > 0 else None
+            if task_repeat is not None:
+                heapq.heappush(heap, (-task_repeat.critical_time, next(order), task_repeat))
+        self.log.flush()
+
+    def build_heft_table(self, plot_file=None):
+        print("#" * 60)
+        print("HEFT scheduling")
+        self.stats.call(self.schedule)
+        print("Total energy:", self.energy, "Watt")
+        if self.rejected:
+            print("Rejected tasks:", self.rejected)
+        self.write_results()
+        self.render(plot_file)
 
 
 if __name__ == "__main__":
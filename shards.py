@@ -0,0 +1,205 @@
+import heapq
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from scheduler import *
+from sweep import ALGORITHMS
+
+# Parsed instance shared read only by the shards of a worker process
+instance = dict()
+
+
+def weak_components(task_store):
+    """
+    # Weakly connected components of the dependency graph, by union-find over the edges with path halving,
+    every root being the smallest row of its component
+    :return: Array of the label of every row, the smallest row of its component
+    """
+    size = task_store.size
+    predecessors, successors = task_store.edges(np.arange(size))
+    by_tid = np.argsort(task_store.tid[:size], kind='stable')
+    predecessors = by_tid[np.searchsorted(task_store.tid[:size][by_tid], predecessors)]
+    parent = list(range(size))
+    for a, b in zip(predecessors.tolist(), successors.tolist()):
+        while parent[a] != a:
+            parent[a] = a = parent[parent[a]]
+        while parent[b] != b:
+            parent[b] = b = parent[parent[b]]
+        if a < b:
+            parent[b] = a
+        elif b < a:
+            parent[a] = b
+    for i in range(size):  # The parents are smaller rows, so they are already pointing at their root
+        parent[i] = parent[parent[i]]
+    return np.array(parent, dtype=np.int64)
+
+
+def partition(task_store, server_store, shards):
+    """
+    # Group the components into shards of balanced work (units of work of every instance), the largest
+    component first into the lightest shard, then give every shard the tightest server left that can run its
+    most demanding task and deal the other servers from the fastest to the shard with the most work per unit of
+    performance
+    :return: List of (task rows, server indices) of every shard in the order of the stores, at most one
+             shard per server
+    """
+    labels = weak_components(task_store)
+    work = task_store.unit_of_work[:task_store.size] * (task_store.repeat[:task_store.size] + 1)
+    components, label_rows = np.unique(labels, return_inverse=True)
+    component_work = np.bincount(label_rows, weights=work)
+    shards = max(1, min(shards, len(components), server_store.size))
+    loads = [(0, i) for i in range(shards)]
+    shard_of = np.zeros(len(components), dtype=np.int64)
+    for component in np.argsort(-component_work, kind='stable').tolist():
+        load, i = heapq.heappop(loads)
+        shard_of[component] = i
+        heapq.heappush(loads, (load + component_work[component], i))
+    shard_work = np.bincount(shard_of, weights=component_work, minlength=shards)
+    task_shard = shard_of[label_rows]
+    headroom = server_store.local_power_cap[:server_store.size] - server_store.static_power[:server_store.size]
+    power = task_store.power[:task_store.size]
+    demand = np.zeros(shards)  # The tasks no server can run are rejected whatever the shard
+    np.maximum.at(demand, task_shard, np.where(power <= headroom.max(), power, 0))
+    capacity = np.zeros(shards)
+    servers = [[] for _ in range(shards)]
+    free = set(range(server_store.size))
+    for i in np.argsort(-demand, kind='stable').tolist():
+        fitting = [index for index in free if headroom[index] >= demand[i]]
+        if not fitting:
+            raise ValueError("No server left for a task of " + str(demand[i]) + " Watt, use fewer shards")
+        index = min(fitting, key=lambda index: (headroom[index], index))
+        free.remove(index)
+        servers[i].append(index)
+        capacity[i] += server_store.performance[index]
+    for index in np.argsort(-server_store.performance, kind='stable').tolist():
+        if index in free:  # The largest work per unit of performance
+            i = int(np.argmax(shard_work / capacity))
+            servers[i].append(index)
+            capacity[i] += server_store.performance[index]
+    return [(np.flatnonzero(task_shard == i), np.sort(servers[i])) for i in range(shards)]
+
+
+def power_shares(parts, task_store, server_store, power_cap, enforce_power_cap=True):
+    """
+    # Split the power cap between the shards: every shard gets the static draw of its servers plus a share of the
+    rest of the cap in proportion to the headroom (local power cap minus static power) of its servers
+    # When the cap is enforced every share is raised to fit the most demanding task the shard could run alone,
+    the shards above that floor giving up the difference in proportion to their margin over their own floor
+    :return: Array of the power cap share of every shard, in the order of parts
+    """
+    static_power = np.asarray(server_store.static_power, dtype=float)
+    headroom = np.asarray(server_store.local_power_cap, dtype=float) - static_power
+    spare = power_cap - static_power.sum()
+    shares = np.array([static_power[indices].sum() + spare * headroom[indices].sum() / max(headroom.sum(), 1)
+                       for rows, indices in parts])
+    if not enforce_power_cap:
+        return shares
+    floors = np.zeros(len(parts))
+    for i, (rows, indices) in enumerate(parts):
+        power = task_store.power[rows]
+        # The tasks over the global spare power or over every server of the shard are rejected anyway
+        power = power[power <= min(spare, headroom[indices].max(initial=float('-inf')))]
+        floors[i] = static_power[indices].sum() + power.max(initial=0)
+    if floors.sum() > power_cap:
+        raise ValueError("The shards need " + str(floors.sum()) + " Watt to run their most demanding tasks at "
+                         "once, over the power cap of " + str(power_cap) + " Watt, use fewer shards")
+    deficit = np.maximum(floors - shares, 0)
+    if deficit.sum() > 0:
+        margin = np.maximum(shares - floors, 0)
+        shares = np.maximum(shares, floors) - margin * deficit.sum() / margin.sum()
+    return shares
+
+
+def init_worker(task_store, server_store, options):
+    instance['task_store'] = task_store
+    instance['server_store'] = server_store
+    instance['options'] = options
+
+
+def run_shard(shard):
+    """
+    # Schedule one shard on its own servers with its share of the power and energy caps
+    :argument shard -> (task rows, server indices, power cap share, energy cap share)
+    :return: (output, energy, missed deadlines, rejected, power times, power changes, static draw)
+    """
+    rows, indices, power_cap, energy_cap = shard
+    options = instance['options']
+    tasks = instance['task_store'].take(rows).tasks()
+    servers = instance['server_store'].take(indices).servers()
+    scheduler = ALGORITHMS[options['algorithm']](tasks=tasks, servers=servers, power_cap=power_cap,
+                                                 frequency=options['frequency'], log=EventLog(level=OFF),
+                                                 energy_cap=energy_cap,
+                                                 enforce_power_cap=options['enforce_power_cap'])
+    if options['algorithm'] == 'WaveFront':
+        scheduler.schedule(options['max_time'])
+    else:
+        scheduler.schedule()
+    return (scheduler.output, scheduler.energy, scheduler.missed_deadlines, scheduler.rejected,
+            scheduler.power_times, scheduler.power_changes, scheduler.static_draw)
+
+
+def simulate(data, algorithm, power_cap, frequency, max_time=None, energy_cap=None, enforce_power_cap=True,
+             shards=None, workers=None):
+    """
+    # Sharded simulation: the independent components of the instance are scheduled in parallel on disjoint
+    partitions of the servers
+    # The shards only share the global budgets, split up front: every shard gets a share of the power cap (see
+    power_shares) and a share of the energy cap in proportion to its work
+    # The power cap is enforced in every shard by default, so the draws of the shards never add up above it
+    # The merge is deterministic for a given number of shards, whatever the number of workers
+    :argument data -> Parser of the instance
+              max_time -> time steps of WaveFront, required for it
+              enforce_power_cap -> keep every shard under its share of the power cap, the merged draw is
+                                   checked against power_cap too
+              shards -> number of shards, the number of cores by default
+    :return: Dictionary of the merged output (sorted by start, server and task), energy, missed_deadlines,
+             rejected, makespan, peak_power and shards
+    """
+    if algorithm == 'WaveFront' and max_time is None:
+        raise ValueError("WaveFront needs max_time")
+    task_store, server_store = data.task_store, data.server_store
+    parts = partition(task_store, server_store, shards or os.cpu_count())
+    static_power = np.asarray(server_store.static_power, dtype=float)
+    shares = power_shares(parts, task_store, server_store, power_cap, enforce_power_cap)
+    work = task_store.unit_of_work[:task_store.size] * (task_store.repeat[:task_store.size] + 1)
+    configurations = [(rows, indices, share, None if energy_cap is None else energy_cap * work[rows].sum() /
+                       work.sum()) for (rows, indices), share in zip(parts, shares.tolist())]
+    options = {'algorithm': algorithm, 'frequency': frequency, 'max_time': max_time,
+               'enforce_power_cap': enforce_power_cap}
+    with ProcessPoolExecutor(max_workers=workers or min(len(parts), os.cpu_count()), initializer=init_worker,
+                             initargs=(task_store, server_store, options)) as pool:
+        results = list(pool.map(run_shard, configurations))
+    output = sorted((row for result in results for row in result[0]), key=lambda row: (row[2], row[1], row[0]))
+    times = np.concatenate([result[4] for result in results]).astype(float)
+    changes = np.concatenate([result[5] for result in results]).astype(float)
+    order = np.argsort(times, kind='stable')
+    draw = sum(result[6] for result in results) + np.cumsum(changes[order])
+    draw = draw[np.append(times[order][1:] != times[order][:-1], True)]  # Draw after the last change of each time
+    peak_power = max(static_power.sum(), draw.max(initial=0))
+    if enforce_power_cap and peak_power > power_cap * (1 + 1e-9):  # The shares are rounded
+        raise ValueError("The shards draw up to " + str(peak_power) + " Watt, over the power cap of " +
+                         str(power_cap) + " Watt")
+    return {'output': output,
+            'energy': sum(result[1] for result in results),
+            'missed_deadlines': sum(result[2] for result in results),
+            'rejected': [task_id for result in results for task_id in result[3]],
+            'makespan': max((row[3] for row in output), default=0),
+            'peak_power': peak_power,
+            'shards': len(parts)}
+
+
+if __name__ == "__main__":
+    # python3 shards.py [algorithm] [shards]
+    parameters = load_params('input.ini')
+    data = Parser(parameters)
+    name = sys.argv[1] if len(sys.argv) > 1 else 'HEFT'
+    result = simulate(data, name, power_cap=int(parameters['power_cap']), frequency=int(parameters['frequency']),
+                      max_time=int(parameters['max_timesteps']), energy_cap=float(parameters['energy_cap']),
+                      shards=int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    print(name, "on", result['shards'], "shards, total energy:", result['energy'], "Watt, makespan:",
+          result['makespan'], "missed deadlines:", result['missed_deadlines'])
+    if result['rejected']:
+        print("Rejected tasks:", result['rejected'])
+    with open("results_" + name + "_sharded.txt", "w") as file1:
+        file1.write("#jobid server_id start end \n" + "".join("%s %s %s %s\n" % tuple(line)
+                                                              for line in result['output']))
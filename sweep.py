@@ -0,0 +1,97 @@
+import configparser
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from scheduler import *
+
+ALGORITHMS = {'WaveFront': WaveFront, 'FIFO': FIFO, 'CPM': CPM, 'HEFT': HEFT}
+COLUMNS = ('algorithm', 'power_cap', 'enforce_power_cap', 'frequency', 'repeat', 'energy', 'makespan',
+           'missed_deadlines', 'rejected', 'peak_power')
+
+# Parsed instance shared read only by the runs of a worker process
+instance = dict()
+
+
+def load_sweep(input_file):
+    """
+    # Parse the SWEEP section of the input.ini file, every option is a comma separated list of values
+    :rtype: Dictionary of lists
+    """
+    config = configparser.ConfigParser()
+    config.read(input_file)
+    grid = dict()
+    for option in config.options('SWEEP'):
+        grid[option] = [value.strip() for value in config.get('SWEEP', option).split(',')]
+    return grid
+
+
+def init_worker(task_store, server_store, max_time, energy_cap=None):
+    instance['task_store'] = task_store
+    instance['server_store'] = server_store
+    instance['max_time'] = max_time
+    instance['energy_cap'] = energy_cap
+
+
+def run_configuration(configuration):
+    """
+    # Run one algorithm on the shared instance, the tasks are a copy of the shared columns
+    :argument configuration -> (algorithm, power_cap, enforce_power_cap, frequency, repeat)
+    :return: Row of the aggregated table
+    """
+    algorithm, power_cap, enforce_power_cap, frequency, repeat = configuration
+    task_store = instance['task_store'].copy()
+    task_store.repeat[task_store.period > 0] = repeat - 1
+    scheduler = ALGORITHMS[algorithm](tasks=task_store.tasks(), servers=instance['server_store'].servers(),
+                                      power_cap=power_cap, frequency=frequency, log=EventLog(level=OFF),
+                                      energy_cap=instance['energy_cap'], enforce_power_cap=enforce_power_cap)
+    if algorithm == 'WaveFront':
+        scheduler.schedule(instance['max_time'])
+    else:
+        scheduler.schedule()
+    return [algorithm, power_cap, enforce_power_cap, frequency, repeat, scheduler.energy, scheduler.makespan(),
+            scheduler.missed_deadlines, len(scheduler.rejected), scheduler.peak_power()]
+
+
+def sweep(data, max_time, power_caps, frequencies, repeats, algorithms=tuple(ALGORITHMS), workers=None,
+          energy_cap=None, enforce_power_caps=(False,)):
+    """
+    # Run every algorithm on every combination of the parameters across a process pool
+    # The instance is parsed once by the caller and sent once to each worker
+    :argument data -> Parser of the instance
+              energy_cap -> energy cap of every run, none by default
+              enforce_power_caps -> whether the power cap is enforced or only warned about, not by default
+    :return: List of rows in the order of the grid
+    """
+    configurations = list(product(algorithms, power_caps, enforce_power_caps, frequencies, repeats))
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(data.task_store, data.server_store, max_time, energy_cap)) as pool:
+        return list(pool.map(run_configuration, configurations, chunksize=max(1, len(configurations) // 64)))
+
+
+def write_table(rows, output_file="sweep_results.txt"):
+    with open(output_file, "w") as file1:
+        file1.write("#" + " ".join(COLUMNS) + "\n")
+        file1.writelines(" ".join(str(e) for e in row) + "\n" for row in rows)
+
+
+def sweep_config(parameters, grid, workers=None):
+    """
+    # Sweep of the grid read by load_sweep, the options missing from the grid take the value of parameters
+    :return: List of rows in the order of the grid
+    """
+    data = Parser(parameters)
+    return sweep(data, max_time=int(parameters['max_timesteps']),
+                 power_caps=[int(v) for v in grid.get('power_cap', [parameters['power_cap']])],
+                 frequencies=[int(v) for v in grid.get('frequency', [parameters['frequency']])],
+                 repeats=[int(v) for v in grid.get('repeat', [parameters['repeat']])],
+                 algorithms=grid.get('algorithms', list(ALGORITHMS)), workers=workers,
+                 energy_cap=float(parameters['energy_cap']) if 'energy_cap' in parameters else None,
+                 enforce_power_caps=[configparser.ConfigParser.BOOLEAN_STATES[v.lower()] for v in grid.get(
+                     'enforce_power_cap', [parameters.get('enforce_power_cap', 'no')])])
+
+
+if __name__ == "__main__":
+    results = sweep_config(load_params('input.ini'), load_sweep('input.ini'))
+    print(" ".join(COLUMNS))
+    for row in results:
+        print(" ".join(str(e) for e in row))
+    write_table(results)
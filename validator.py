@@ -0,0 +1,149 @@
+import sys
+import numpy as np
+from scheduler import load_params, Parser
+
+EPSILON = 1e-9  # Tolerance of the time comparisons, the end times come from divisions
+VIOLATIONS = ('unknown', 'overlap', 'precedence', 'arrival', 'local_power', 'global_power')
+
+
+def read_results(file_name):
+    """
+    # Load a results_*.txt file written by write_results
+    :return: (n, 4) array of (job id, server id, start, end)
+    """
+    return np.loadtxt(file_name, comments='#', ndmin=2).reshape(-1, 4)
+
+
+def lookup(keys, values):
+    """
+    # Index in keys of every value, the first one when a key is repeated, -1 when missing
+    """
+    if not len(keys):
+        return np.full(len(values), -1)
+    order = np.argsort(keys, kind='stable')
+    position = np.minimum(np.searchsorted(keys[order], values), len(keys) - 1)
+    found = order[position]
+    return np.where(keys[found] == values, found, -1)
+
+
+def group_starts(keys):
+    """
+    # Mask of the first row of every run of equal keys
+    """
+    return np.append(True, keys[1:] != keys[:-1]) if len(keys) else np.zeros(0, dtype=bool)
+
+
+def validate(output, task_store, server_store, power_cap=None):
+    """
+    # Check a schedule in O(n log n): every check sorts the rows once and sweeps them
+    # unknown: task or server not in the instance
+    # overlap: row starting on a server before an earlier row of the server ends
+    # precedence: first instance of a task starting before the first instance of a predecessor ends
+    # arrival: k-th instance of a task starting before arrival_date + k * period
+    # local_power / global_power: row whose start takes the draw of its server over local_power_cap,
+    or the draw of all the servers over power_cap
+    :argument output -> rows of (job id, server id, start, end), self.output or read_results
+    :return: Dictionary of the violations (name -> indices of the offending rows, sorted) and of the metrics:
+             makespan, utilisation (server id -> busy time / makespan), deadline_misses and peak_power
+    """
+    rows = np.asarray(output, dtype=float).reshape(-1, 4)
+    size = task_store.size
+    task = lookup(task_store.tid[:size], rows[:, 0].astype(np.int64))
+    server = lookup(np.asarray(server_store.server_id), rows[:, 1].astype(np.int64))
+    report = {'unknown': np.flatnonzero((task < 0) | (server < 0))}
+    index = np.flatnonzero((task >= 0) & (server >= 0))  # The other checks only look at the known rows
+    task, server = task[index], server[index]
+    tid, start, end = rows[index, 0].astype(np.int64), rows[index, 2], rows[index, 3]
+
+    # Instances: the rows of a task by start time, the k-th one arrives k periods after the task
+    order = np.lexsort((start, tid))
+    first = group_starts(tid[order])
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order)) - np.maximum.accumulate(np.where(first, np.arange(len(order)), 0))
+    shift = rank * task_store.period[task]
+    report['arrival'] = index[start < task_store.arrival_date[task] + shift - EPSILON]
+    missed = end > task_store.deadline[task] + shift + EPSILON
+
+    # Precedence between the first instances
+    first_rows = order[first]
+    predecessors, successors = task_store.edges(np.arange(size))
+    successor = lookup(tid[first_rows], task_store.tid[successors])
+    predecessor = lookup(tid[first_rows], predecessors)
+    placed = (successor >= 0) & (predecessor >= 0)
+    successor, predecessor = first_rows[successor[placed]], first_rows[predecessor[placed]]
+    report['precedence'] = np.unique(index[successor[start[successor] < end[predecessor] - EPSILON]])
+
+    # Overlaps: on each server, a row starting before the latest end of the rows started before it
+    order = np.lexsort((start, server))
+    overlap = []
+    for rows_of_server in np.split(order, np.flatnonzero(group_starts(server[order]))[1:]):
+        latest = np.maximum.accumulate(end[rows_of_server])
+        overlap.append(rows_of_server[1:][start[rows_of_server[1:]] < latest[:-1] - EPSILON])
+    report['overlap'] = np.sort(index[np.concatenate(overlap or [np.zeros(0, dtype=np.int64)])])
+
+    # Power sweeps: +power at the start and -power at the end of every row, the ends first on ties
+    power = task_store.power[task].astype(float)
+    times = np.concatenate((start, end))
+    changes = np.concatenate((power, -power))
+    event_rows = np.concatenate((np.arange(len(index)), np.arange(len(index))))
+    event_servers = np.concatenate((server, server))
+    static_power = np.asarray(server_store.static_power, dtype=float)
+    # Sorted by server the draws of the previous servers sum to 0, so the running sum is the draw of the server
+    order = np.lexsort((changes, times, event_servers))
+    draw = static_power[event_servers[order]] + np.cumsum(changes[order])
+    over = draw > np.asarray(server_store.local_power_cap, dtype=float)[event_servers[order]] + EPSILON
+    report['local_power'] = np.unique(index[event_rows[order][over & (changes[order] > 0)]])
+    order = np.lexsort((changes, times))
+    draw = static_power.sum() + np.cumsum(changes[order])
+    last = group_starts(times[order][::-1])[::-1]  # Draw after the last change of each time
+    report['peak_power'] = max(static_power.sum(), draw[last].max(initial=0))
+    if power_cap is not None:
+        over = (draw > power_cap + EPSILON) & (changes[order] > 0)
+        report['global_power'] = np.unique(index[event_rows[order][over]])
+    else:
+        report['global_power'] = np.zeros(0, dtype=np.int64)
+
+    makespan = end.max(initial=0)
+    busy = np.bincount(server, weights=end - start, minlength=len(static_power))
+    report['makespan'] = makespan
+    report['utilisation'] = dict(zip(np.asarray(server_store.server_id).tolist(),
+                                     (busy / makespan if makespan else busy).tolist()))
+    report['deadline_misses'] = int(missed.sum())
+    return report
+
+
+def print_report(report, output=None, limit=10):
+    """
+    # Text of a report, the first offending rows of every violation are listed when output is given
+    """
+    print("Makespan:", report['makespan'], "Peak power:", report['peak_power'], "Watt, missed deadlines:",
+          report['deadline_misses'])
+    print("Utilisation:", " ".join("%s: %.3f" % item for item in report['utilisation'].items()))
+    for name in VIOLATIONS:
+        violations = report[name]
+        print("%s violations: %d" % (name, len(violations)))
+        if output is not None:
+            for i in violations[:limit].tolist():
+                print("   ", np.asarray(output[i]).tolist())
+
+
+def validate_files(file_names, parameters):
+    """
+    # Validate and report result files against the instance of the input parameters
+    :return: True when no file has a violation
+    """
+    data = Parser(parameters)
+    valid = True
+    for file_name in file_names:
+        print("#" * 60)
+        print(file_name)
+        results = read_results(file_name)
+        report = validate(results, data.task_store, data.server_store, int(parameters['power_cap']))
+        print_report(report, results)
+        valid = valid and not any(len(report[name]) for name in VIOLATIONS)
+    return valid
+
+
+if __name__ == "__main__":
+    # python3 validator.py results_WaveFront.txt [results_FIFO.txt ...], the instance is read from input.ini
+    exit(0 if validate_files(sys.argv[1:], load_params('input.ini')) else 1)